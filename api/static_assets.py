@@ -0,0 +1,259 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from email.utils import formatdate, parsedate
+from typing import Dict, List, Optional, Tuple
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.types import Scope
+
+# brotli is a project dependency; without it only gzip copies are made
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Number of hex digits of the content hash put into fingerprinted file names
+FINGERPRINT_LENGTH = 12
+
+# Cache-Control for fingerprinted asset URLs: the content behind such a URL
+# never changes, so browsers may keep it for a year without asking again
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Cache-Control for the page and for plain asset URLs: keep a copy, but
+# revalidate it with the ETag or Last-Modified date before every use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Seconds a cached file is served before its mtime is checked again; 0 checks on every request
+ASSET_RECHECK_SECONDS = float(os.environ.get("TASKS_ASSET_RECHECK_SECONDS", "1"))
+
+# Files smaller than this are only kept uncompressed
+MIN_COMPRESS_BYTES = 256
+
+# "style.0123456789ab.css" -> ("style", "0123456789ab", ".css")
+_FINGERPRINTED_NAME = re.compile(r"^(.+)\.([0-9a-f]{%d})(\.[A-Za-z0-9]+)$" % FINGERPRINT_LENGTH)
+
+# Asset references in the page: "/static/<name>", with any query string
+_ASSET_URL = re.compile(r"/static/([\w.-]+\.(?:css|js))(?:\?[^\"'\s>]*)?")
+
+
+class Asset:
+    """
+    A file held in memory, with its precompressed variants and the validators
+    sent with it. `version` is the (mtime_ns, size) it was read at.
+    """
+
+    def __init__(self, body: bytes, media_type: str, mtime: float, version: Tuple[int, int]):
+        self.media_type = media_type
+        self.version = version
+        self.fingerprint = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        self.last_modified = formatdate(mtime, usegmt=True)
+        # encoding -> body, each variant only kept when it is smaller
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_BYTES:
+            compressed = {"gzip": gzip.compress(body, 9, mtime=0)}
+            if brotli is not None:
+                compressed["br"] = brotli.compress(body, quality=11)
+            for encoding, data in compressed.items():
+                if len(data) < len(body):
+                    self.variants[encoding] = data
+        # When the cache last confirmed the file is unchanged
+        self.checked = time.monotonic()
+
+    def etag(self, encoding: str) -> str:
+        """Strong ETag of one variant; the variants of an asset share the fingerprint"""
+        return f'"{self.fingerprint}"' if encoding == "identity" else f'"{self.fingerprint}-{encoding}"'
+
+
+class AssetCache:
+    """
+    The files of the static directory, read and compressed once and then served
+    from memory. A cached file is checked against its mtime and size at most
+    every ASSET_RECHECK_SECONDS, and read again once either changes.
+    The page is cached too, rendered with fingerprinted asset URLs, and rendered
+    again whenever it or one of the assets it links to changes.
+    """
+
+    def __init__(self, directory: str, recheck_seconds: float = ASSET_RECHECK_SECONDS):
+        self.directory = directory
+        self.recheck_seconds = recheck_seconds
+        self._assets: Dict[str, Asset] = {}
+        # page name -> (rendered page, source version, fingerprints of the linked assets)
+        self._pages: Dict[str, Tuple[Asset, Tuple[int, int], Dict[str, str]]] = {}
+
+    def preload(self):
+        """Read every file in the directory into the cache"""
+        for name in os.listdir(self.directory):
+            if os.path.isfile(os.path.join(self.directory, name)):
+                self.get(name)
+
+    def get(self, name: str) -> Optional[Asset]:
+        """
+        The cached file with the given name, reading it if it isn't cached or has
+        changed. Returns None if there is no such file.
+        """
+        asset = self._assets.get(name)
+        now = time.monotonic()
+        if asset is not None and now - asset.checked < self.recheck_seconds:
+            return asset
+
+        path = os.path.join(self.directory, name)
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            self._assets.pop(name, None)
+            return None
+        version = (stat_result.st_mtime_ns, stat_result.st_size)
+        if asset is not None and asset.version == version:
+            asset.checked = now
+            return asset
+
+        with open(path, "rb") as f:
+            body = f.read()
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type == "application/javascript":
+            media_type += "; charset=utf-8"
+        asset = Asset(body, media_type, stat_result.st_mtime, version)
+        self._assets[name] = asset
+        return asset
+
+    def get_page(self, name: str) -> Optional[Asset]:
+        """
+        The page with the given name, with its asset URLs fingerprinted.
+        Returns None if there is no such file.
+        """
+        source = self.get(name)
+        if source is None:
+            self._pages.pop(name, None)
+            return None
+        cached = self._pages.get(name)
+        if cached is not None:
+            page, version, linked = cached
+            if version == source.version and all(self._fingerprint(asset) == digest for asset, digest in linked.items()):
+                return page
+
+        linked = {}
+
+        def replace(match: re.Match) -> str:
+            asset_name = match.group(1)
+            digest = self._fingerprint(asset_name)
+            linked[asset_name] = digest
+            if digest is None:
+                return match.group(0)
+            return f"/static/{fingerprinted_name(asset_name, digest)}"
+
+        html = _ASSET_URL.sub(replace, source.variants["identity"].decode())
+        # The page changes whenever a linked asset does, so it was last modified
+        # when the newest of them was
+        mtime = max([source.version[0]] + [self._assets[asset].version[0] for asset, digest in linked.items() if digest]) / 1e9
+        page = Asset(html.encode(), "text/html; charset=utf-8", mtime, source.version)
+        self._pages[name] = (page, source.version, linked)
+        return page
+
+    def _fingerprint(self, name: str) -> Optional[str]:
+        asset = self.get(name)
+        return asset.fingerprint if asset is not None else None
+
+
+def fingerprinted_name(name: str, digest: str) -> str:
+    """The file name with the fingerprint before its extension: style.css -> style.<digest>.css"""
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest}{extension}"
+
+
+def split_fingerprint(name: str) -> Tuple[str, Optional[str]]:
+    """The plain file name and the fingerprint in a requested name, or None when it has none"""
+    match = _FINGERPRINTED_NAME.match(name)
+    if match is None:
+        return name, None
+    stem, digest, extension = match.groups()
+    return stem + extension, digest
+
+
+def _accepted_encodings(accept_encoding: str) -> List[str]:
+    """The content codings in an Accept-Encoding header that aren't refused with q=0"""
+    accepted = []
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.append(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(asset: Asset, accept_encoding: Optional[str]) -> str:
+    """The smallest variant of the asset that the client accepts"""
+    accepted = _accepted_encodings(accept_encoding or "")
+    best = "identity"
+    for encoding, data in asset.variants.items():
+        if (encoding in accepted or "*" in accepted) and len(data) < len(asset.variants[best]):
+            best = encoding
+    return best
+
+
+def _not_modified(request_headers: Headers, asset: Asset) -> bool:
+    """Whether If-None-Match, or failing that If-Modified-Since, still matches the asset"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        # Any variant's ETag will do: they all stand for the same content
+        for candidate in if_none_match.split(","):
+            candidate = candidate.strip().removeprefix("W/")
+            if candidate == "*" or candidate.strip('"').split("-")[0] == asset.fingerprint:
+                return True
+        return False
+    if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+    return if_modified_since is not None and if_modified_since >= parsedate(asset.last_modified)
+
+
+def asset_response(asset: Asset, request_headers: Headers, cache_control: str) -> Response:
+    """
+    The asset in the smallest encoding the request accepts, or 304 Not Modified
+    when the request's validators still match.
+    """
+    encoding = choose_encoding(asset, request_headers.get("accept-encoding"))
+    headers = {
+        "ETag": asset.etag(encoding),
+        "Last-Modified": asset.last_modified,
+        "Cache-Control": cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request_headers, asset):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset.variants[encoding], media_type=asset.media_type, headers=headers)
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    Static files served from an AssetCache instead of from disk. Files can also
+    be requested under fingerprinted names, as rendered into the page by
+    AssetCache.get_page(). A fingerprinted URL that matches the file's current
+    content is cached for a year as immutable. Plain names, and fingerprints of
+    older content, must be revalidated every time.
+    """
+
+    def __init__(self, cache: AssetCache):
+        super().__init__(directory=cache.directory, check_dir=False)
+        self.cache = cache
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        # The cache holds the files at the top of the directory only
+        name, digest = split_fingerprint(path)
+        asset = self.cache.get(name) if name == os.path.basename(name) and not name.startswith(".") else None
+        if asset is None:
+            raise HTTPException(status_code=404)
+        cache_control = IMMUTABLE_CACHE_CONTROL if digest == asset.fingerprint else REVALIDATE_CACHE_CONTROL
+        return asset_response(asset, Headers(scope=scope), cache_control)
@@ -1,20 +1,82 @@
-from fastapi import APIRouter, HTTPException, status
-from models.task import Task, TaskCreate, TaskUpdate, TaskComplete, TaskIgnore, TaskList, TaskMove, TasksState
+from fastapi import APIRouter, Depends, File, Header, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
+from concurrent.futures import Future
+from typing import List, Literal, Optional
+from models.task import Task, TaskCreate, TaskUpdate, TaskComplete, TaskIgnore, TaskMove, TasksState, TaskPage, ColumnSummary, BoardStats, Board, TaskChanges, SearchResults, ImportResult, BatchOperation, BatchRequest, BatchResponse
 import db.in_memory_db
-from db.file_persistence import clear_file_data
+from db import export, importer
+from db.broadcaster import EVICTED, RESYNC, encode_event
+from db.log import get_logger, log_event
+from db.serialization import dumps, encode_board, encode_columns, encode_page
+from db.task_record import TaskRecord
+from itertools import islice
+import asyncio
+import logging
 import uuid
 
-router = APIRouter()
+# How long a request that arrives during startup waits for the data to load
+LOAD_WAIT_SECONDS = 30
 
+# Seconds between keep-alive comments on an idle event stream
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Number of tasks rendered at a time by GET /tasks/export
+EXPORT_CHUNK_SIZE = 1000
+
+# Number of tasks POST /tasks/import adds to the store at a time
+IMPORT_APPLY_SIZE = 10000
+
+logger = get_logger("api")
+
+
+async def _require_loaded():
+    """
+    Holds requests until the initial load from storage has finished.
+    Raises a 503 error if it doesn't finish within LOAD_WAIT_SECONDS.
+    """
+    if not await db.in_memory_db.wait_until_loaded(LOAD_WAIT_SECONDS):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Tasks are still loading",
+            headers={"Retry-After": "1"},
+        )
+
+
+async def _sync_shared_state():
+    """
+    Pulls changes made by other worker processes before the request is handled,
+    so reads reflect every write that completed before them.
+    """
+    await db.in_memory_db.sync_shared_state()
+
+
+router = APIRouter(dependencies=[Depends(_require_loaded), Depends(_sync_shared_state)])
+
+
+def _json_response(content: bytes, headers: Optional[dict] = None) -> Response:
+    """
+    Wraps pre-encoded JSON in a response, so FastAPI returns it as is instead
+    of validating and re-encoding it through the response model.
+    """
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+async def _commit(write: Future):
+    """
+    Waits for the write returned when the change was queued, when durable
+    writes are enabled. Raises a 500 error if the write failed.
+    """
+    if not await db.in_memory_db.commit(write):
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to save tasks to file")
 
 
 @router.post("/save")
 async def save_to_file_api():
     """
-    Saves current in-memory tasks to local file.
+    Forces the persistence worker to write a full snapshot now.
     Returns success status.
     """
-    success = db.in_memory_db.save_current_state()
+    success = await db.in_memory_db.flush()
     if success:
         return {"message": "Tasks saved to file successfully"}
     else:
@@ -27,22 +89,19 @@ async def load_from_file_api():
     Loads tasks from local file into memory.
     Returns the loaded tasks.
     """
-    print("Load from file API called")
     try:
-        print("Calling reload_from_file()...")
-        db.in_memory_db.reload_from_file()
-        print(f"After reload - Signal: {len(db.in_memory_db.databases['signal'])}, Noise: {len(db.in_memory_db.databases['noise'])}")
-        result = {
-            "message": "Tasks loaded from file successfully",
-            "tasks": {
-                "signal": [task.dict() for task in db.in_memory_db.databases["signal"]],
-                "noise": [task.dict() for task in db.in_memory_db.databases["noise"]]
-            }
-        }
-        print(f"Returning: {len(result['tasks']['signal'])} signal tasks, {len(result['tasks']['noise'])} noise tasks")
-        return result
+        async with db.in_memory_db.lock_columns():
+            # Write pending changes first so the reload doesn't discard them
+            await db.in_memory_db.flush()
+            await db.in_memory_db.reload_from_file()
+        signal_tasks = db.in_memory_db.databases["signal"]
+        noise_tasks = db.in_memory_db.databases["noise"]
+        log_event(logger, logging.INFO, "tasks_loaded", route="POST /tasks/load", signal=len(signal_tasks), noise=len(noise_tasks))
+        return _json_response(
+            b'{"message":"Tasks loaded from file successfully","tasks":' + encode_columns(signal_tasks, noise_tasks) + b"}"
+        )
     except Exception as e:
-        print(f"Error in load_from_file_api: {e}")
+        log_event(logger, logging.ERROR, "load_failed", route="POST /tasks/load", error=str(e))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to load tasks from file: {str(e)}")
 
 
@@ -53,13 +112,16 @@ async def clear_all_data_api():
     Returns success status.
     """
     try:
-        # Clear in-memory data
-        db.in_memory_db.databases["signal"].clear()
-        db.in_memory_db.databases["noise"].clear()
-        
-        # Clear file data
-        success = clear_file_data()
-        
+        async with db.in_memory_db.lock_columns():
+            # Let pending writes finish so they can't resurrect cleared tasks
+            await db.in_memory_db.flush()
+
+            # Clear in-memory data
+            db.in_memory_db.replace_columns([], [])
+
+            # Clear stored data
+            success = await db.in_memory_db.run_io(db.in_memory_db.storage.clear)
+
         if success:
             return {"message": "All data cleared successfully"}
         else:
@@ -68,17 +130,321 @@ async def clear_all_data_api():
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to clear data: {str(e)}")
 
 
-@router.get("/column/{column}", response_model=TaskList)
-async def get_tasks_api(column: str):
+def _encode_cursor(task: TaskRecord) -> str:
+    """Encodes the position of a task as an opaque page cursor"""
+    return f"{task.order}:{task.id}"
+
+
+def _decode_cursor(cursor: str):
+    """
+    Decodes a page cursor into the (order, id) key it points at.
+    Raises a 400 error if the cursor is malformed.
+    """
+    order, _, task_id = cursor.partition(":")
+    try:
+        return (int(order), task_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+@router.get("/stats", response_model=BoardStats)
+async def get_stats_api():
     """
-    Retrieves all tasks for a given column (signal or noise).
+    Returns the total, completed, ignored and effective task counts per column.
+    The counters are maintained on every mutation, so this never visits a task.
+    """
+    return db.in_memory_db.get_stats()
+
+
+def _board_etag() -> str:
+    """Strong ETag identifying the current board version"""
+    return f'"{db.in_memory_db.board_epoch}-{db.in_memory_db.version}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the given ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@router.get("/board", response_model=Board, responses={304: {"description": "Board unchanged"}})
+async def get_board_api(if_none_match: Optional[str] = Header(None)):
+    """
+    Retrieves both columns in order along with the counters, in one response.
+    The response carries the board version as its ETag; a request whose
+    If-None-Match header matches the current version gets 304 Not Modified.
+    """
+    etag = _board_etag()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return _json_response(encode_board(db.in_memory_db.get_board()), headers)
+
+
+@router.get("/changes", response_model=TaskChanges)
+async def get_changes_api(since: int = Query(..., ge=0), epoch: Optional[str] = None):
+    """
+    Lists the inserts, updates, moves and deletes made after board version
+    `since`, oldest first, so a client holding that version can catch up
+    without downloading the whole board.
+    Pass the epoch from the board or the last feed response; versions from
+    another server run, or older than the change log reaches back, get
+    "resync": true and no changes, meaning the client should fetch /board again.
+    Returns the current epoch and version along with the changes.
+    """
+    with db.in_memory_db.transaction():
+        changes = None
+        if epoch is None or epoch == db.in_memory_db.board_epoch:
+            changes = db.in_memory_db.get_changes(since)
+        feed = {
+            "epoch": db.in_memory_db.board_epoch,
+            "version": db.in_memory_db.version,
+            "resync": changes is None,
+            "changes": changes or [],
+        }
+    return _json_response(dumps(feed))
+
+
+def _replay_events(last_event_id: Optional[str]) -> List[bytes]:
+    """
+    The events a reconnecting client missed since Last-Event-ID, or a single
+    resync event when they are no longer in the change log.
+    """
+    epoch, _, last_version = (last_event_id or "").rpartition("-")
+    changes = None
+    if epoch == db.in_memory_db.board_epoch and last_version.isdigit():
+        changes = db.in_memory_db.get_changes(int(last_version))
+    if changes is None:
+        version = db.in_memory_db.version
+        return [encode_event("resync", {"epoch": db.in_memory_db.board_epoch, "version": version}, db.in_memory_db.event_id(version))]
+    return [encode_event("change", change, db.in_memory_db.event_id(change["version"])) for change in changes]
+
+
+@router.get("/events")
+async def events_api(last_event_id: Optional[str] = Header(None)):
+    """
+    Streams board changes to the client as Server-Sent Events.
+    The stream opens with a "hello" event carrying the epoch and version, then
+    sends a "change" event (the same entries as /changes) for every mutation,
+    or "resync" when the whole board changed. A client reconnecting with
+    Last-Event-ID first receives the events it missed.
+    A client that falls EVENT_QUEUE_SIZE events behind gets a single "resync"
+    in place of the backlog, and is disconnected if it doesn't read that
+    within EVENT_EVICT_SECONDS, so slow consumers can't hold up the others.
+    """
+    broadcaster = db.in_memory_db.broadcaster
+    # Subscribe before reading the replay, so nothing falls in between
+    subscriber = broadcaster.subscribe()
+    with db.in_memory_db.transaction():
+        hello = {"epoch": db.in_memory_db.board_epoch, "version": db.in_memory_db.version}
+        replay = _replay_events(last_event_id) if last_event_id else []
+
+    async def stream():
+        subscriber.task = asyncio.current_task()
+        try:
+            yield b"retry: 1000\n" + encode_event("hello", hello)
+            for message in replay:
+                yield message
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": heartbeat\n\n"
+                    continue
+                if message is RESYNC or message is EVICTED:
+                    subscriber.resynced()
+                    version = db.in_memory_db.version
+                    reason = "evicted" if message is EVICTED else "fell behind"
+                    yield encode_event("resync", {"epoch": db.in_memory_db.board_epoch, "version": version, "reason": reason})
+                    if message is EVICTED:
+                        return
+                    continue
+                yield message
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/import", response_model=ImportResult, status_code=status.HTTP_201_CREATED)
+async def import_tasks_api(
+    file: UploadFile = File(...),
+    format: Optional[Literal["markdown", "csv", "ndjson"]] = None,
+    column: str = "signal",
+):
+    """
+    Adds the tasks from an uploaded Markdown checklist, CSV or NDJSON file
+    (the formats of /export) after the existing tasks of their columns.
+    The format comes from 'format', or else from the file extension. Tasks that
+    don't name a column go to 'column'.
+    The file is read a line at a time and validated in chunks; if any row is
+    invalid, nothing is added and a 400 error lists the first failing rows.
+    Otherwise the tasks are added, a chunk at a time, and persisted in a single write.
+    Returns the number of tasks added per column and the new board version.
     Raises a 404 error if the column is invalid.
     """
     if column not in db.in_memory_db.databases:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
-    # Return tasks sorted by order
-    sorted_tasks = sorted(db.in_memory_db.databases[column], key=lambda x: x.order)
-    return {"tasks": sorted_tasks}
+    format = format or importer.detect_format(file.filename)
+    if format is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown file format, pass format=markdown, csv or ndjson")
+
+    try:
+        tasks, errors = await db.in_memory_db.run_io(importer.parse_tasks, file.file, format, column, list(db.in_memory_db.databases))
+    except importer.InvalidImport as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        await file.close()
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "Import rejected, no tasks were added", "errors": errors},
+        )
+
+    imported = sum(len(column_tasks) for column_tasks in tasks.values())
+    if not imported:
+        return {"imported": {name: 0 for name in tasks}, "version": db.in_memory_db.version}
+
+    async with db.in_memory_db.lock_columns():
+        # Added on the event loop, since the routes read the columns without the
+        # lock, and a chunk at a time, so other requests are served in between
+        chunks = [
+            {name: column_tasks[start:start + IMPORT_APPLY_SIZE]}
+            for name, column_tasks in tasks.items()
+            for start in range(0, len(column_tasks), IMPORT_APPLY_SIZE)
+        ]
+        for index, chunk in enumerate(chunks):
+            db.in_memory_db.append_tasks(chunk, resync=index == len(chunks) - 1)
+            await asyncio.sleep(0)
+        version = db.in_memory_db.version
+
+        # Auto-save to file in a single write; a snapshot is cheaper when most of the
+        # board is new, except with shared storage, which never takes one
+        board_size = sum(len(column_tasks) for column_tasks in db.in_memory_db.databases.values())
+        if imported * 2 > board_size and not db.in_memory_db.storage.shared:
+            write = db.in_memory_db.mark_dirty()
+        else:
+            write = db.in_memory_db.save_records([
+                db.in_memory_db.task_change_record(name, task) for name, column_tasks in tasks.items() for task in column_tasks
+            ])
+    await _commit(write)
+
+    return {"imported": {name: len(column_tasks) for name, column_tasks in tasks.items()}, "version": version}
+
+
+@router.get("/search", response_model=SearchResults)
+async def search_tasks_api(
+    q: str = Query(..., min_length=1, max_length=200),
+    column: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+):
+    """
+    Finds the tasks whose text has a word starting with each word of 'q', so
+    "buy mi" matches "Buy milk". Matching ignores case.
+    Optionally restricted to one column. Returns the total number of matches
+    and the first 'limit' of them in board order.
+    Raises a 404 error if the column is invalid.
+    """
+    if column is not None and column not in db.in_memory_db.databases:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
+
+    total, matches = db.in_memory_db.search_tasks(q, column, limit)
+    results = {
+        "query": q,
+        "total": total,
+        "hits": [{"column": name, "task": task.to_dict()} for name, task in matches],
+    }
+    return _json_response(dumps(results))
+
+
+@router.get("/export", responses={304: {"description": "Export unchanged"}})
+async def export_api(format: Literal["markdown", "csv", "ndjson"] = "markdown", if_none_match: Optional[str] = Header(None)):
+    """
+    Downloads the whole board as a Markdown checklist, CSV or NDJSON file.
+    The export is rendered EXPORT_CHUNK_SIZE tasks at a time while it streams,
+    so memory use doesn't grow with the board. The rendered file is cached on
+    disk for the board version it shows; downloading an unchanged board again
+    serves that file, with the version as its ETag for If-None-Match.
+    """
+    media_type, extension = export.EXPORT_FORMATS[format]
+    headers = {"Content-Disposition": f'attachment; filename="tasks.{extension}"', "Cache-Control": "no-cache"}
+
+    etag = _board_etag()
+    cached = export.cache.get(format, etag)
+    if cached is not None:
+        headers["ETag"] = etag
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return FileResponse(cached, media_type=media_type, headers=headers)
+
+    columns = [(column, db.in_memory_db.read_in_chunks(column, EXPORT_CHUNK_SIZE)) for column in db.in_memory_db.databases]
+    chunks = export.RENDERERS[format](columns)
+    # No ETag here: the board may change while the export streams
+    return StreamingResponse(export.cache.store(format, etag, chunks, _board_etag), media_type=media_type, headers=headers)
+
+
+@router.get("/column/{column}", response_model=TaskPage)
+async def get_tasks_api(
+    column: str,
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    completed: Optional[bool] = None,
+    ignored: Optional[bool] = None,
+):
+    """
+    Retrieves the tasks for a given column (signal or noise) in order.
+    Without 'limit' the whole column is returned. With 'limit', at most that many
+    tasks are returned along with a 'next_cursor' to pass back as 'cursor' for the
+    following page. Cursors point at an order key rather than an offset, so tasks
+    inserted or deleted elsewhere in the column don't shift the next page.
+    'completed' and 'ignored' restrict the tasks to those with that status, using
+    the column's status sets rather than checking and encoding every task.
+    Raises a 404 error if the column is invalid.
+    """
+    if column not in db.in_memory_db.databases:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
+
+    # Columns are kept in order, so no sorting is needed
+    after = _decode_cursor(cursor) if cursor else None
+    tasks = db.in_memory_db.databases[column].filtered(completed, ignored, after)
+    if limit is None:
+        return _json_response(encode_page(tasks, None))
+
+    page = list(islice(tasks, limit + 1))
+    next_cursor = _encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return _json_response(encode_page(page[:limit], next_cursor))
+
+
+@router.head("/column/{column}")
+async def count_tasks_head_api(column: str):
+    """
+    Reports the number of tasks in a column in the X-Total-Count header.
+    Raises a 404 error if the column is invalid.
+    """
+    if column not in db.in_memory_db.databases:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
+    return Response(headers={"X-Total-Count": str(len(db.in_memory_db.databases[column]))})
+
+
+@router.get("/column/{column}/summary", response_model=ColumnSummary)
+async def get_column_summary_api(column: str):
+    """
+    Returns the number of tasks in a column without the tasks themselves.
+    Raises a 404 error if the column is invalid.
+    """
+    if column not in db.in_memory_db.databases:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
+    return {"column": column, "count": len(db.in_memory_db.databases[column])}
 
 
 @router.post("/column/{column}", response_model=Task, status_code=status.HTTP_201_CREATED)
@@ -91,16 +457,17 @@ async def add_task_api(column: str, task_create: TaskCreate):
     if column not in db.in_memory_db.databases:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
 
-    # Calculate the next order number (highest order + 1)
-    max_order = max([task.order for task in db.in_memory_db.databases[column]], default=-1)
-    new_task = Task(id=str(uuid.uuid4()), text=task_create.text, order=max_order + 1)
+    async with db.in_memory_db.lock_columns(column):
+        # Calculate the next order number, leaving a gap after the highest order
+        new_task = TaskRecord(str(uuid.uuid4()), task_create.text, db.in_memory_db.next_order(column))
 
-    db.in_memory_db.databases[column].append(new_task)
-    
-    # Auto-save to file
-    db.in_memory_db.save_current_state()
+        db.in_memory_db.insert_task(column, new_task)
 
-    return new_task
+        # Auto-save to file
+        write = db.in_memory_db.save_task_change(column, new_task)
+    await _commit(write)
+
+    return new_task.to_dict()
 
 
 # CRITICAL: Specific routes with suffixes must come BEFORE the general route
@@ -117,14 +484,16 @@ async def toggle_complete_api(column: str, task_id: str, task_complete: TaskComp
     if column not in db.in_memory_db.databases:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
 
-    for i, task in enumerate(db.in_memory_db.databases[column]):
-        if task.id == task_id:
-            db.in_memory_db.databases[column][i].completed = task_complete.completed
-            # Auto-save to file
-            db.in_memory_db.save_current_state()
-            return db.in_memory_db.databases[column][i]
+    async with db.in_memory_db.lock_columns(column):
+        task = db.in_memory_db.find_task(column, task_id)
+        if task is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
 
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        db.in_memory_db.set_completed(column, task, task_complete.completed)
+        # Auto-save to file
+        write = db.in_memory_db.save_task_change(column, task)
+    await _commit(write)
+    return task.to_dict()
 
 
 @router.put("/column/{column}/{task_id}/ignore", response_model=Task)
@@ -135,29 +504,24 @@ async def toggle_ignore_api(column: str, task_id: str, task_ignore: TaskIgnore):
     Expects a JSON body with an 'ignored' boolean field.
     Returns the updated task.
     """
-    print(f"Ignore API called for task {task_id} in column {column}, ignored={task_ignore.ignored}")
-    
     if column not in db.in_memory_db.databases:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
 
-    for i, task in enumerate(db.in_memory_db.databases[column]):
-        if task.id == task_id:
-            print(f"Found task: {task.text}, current ignored status: {getattr(task, 'ignored', 'NOT_SET')}")
-            
-            # Ensure task has ignored field (for backward compatibility)
-            if not hasattr(task, 'ignored'):
-                task.ignored = False
-                print("Added missing ignored field to task")
-            
-            db.in_memory_db.databases[column][i].ignored = task_ignore.ignored
-            print(f"Updated task ignored status to: {task_ignore.ignored}")
-            
-            # Auto-save to file
-            result = db.in_memory_db.save_current_state()
-            print(f"Save result: {result}")
-            return db.in_memory_db.databases[column][i]
-
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    async with db.in_memory_db.lock_columns(column):
+        task = db.in_memory_db.find_task(column, task_id)
+        if task is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+
+        db.in_memory_db.set_ignored(column, task, task_ignore.ignored)
+        log_event(
+            logger, logging.INFO, "task_ignored", route="PUT /tasks/column/{column}/{task_id}/ignore",
+            column=column, task_id=task_id, ignored=task_ignore.ignored, debug={"text": task.text},
+        )
+
+        # Auto-save to file
+        write = db.in_memory_db.save_task_change(column, task)
+    await _commit(write)
+    return task.to_dict()
 
 
 # General edit route - MUST come after specific routes with suffixes
@@ -171,14 +535,16 @@ async def edit_task_api(column: str, task_id: str, task_update: TaskUpdate):
     if column not in db.in_memory_db.databases:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
 
-    for i, task in enumerate(db.in_memory_db.databases[column]):
-        if task.id == task_id:
-            db.in_memory_db.databases[column][i].text = task_update.text
-            # Auto-save to file
-            db.in_memory_db.save_current_state()
-            return db.in_memory_db.databases[column][i]
+    async with db.in_memory_db.lock_columns(column):
+        task = db.in_memory_db.find_task(column, task_id)
+        if task is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
 
-    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        db.in_memory_db.set_text(column, task, task_update.text)
+        # Auto-save to file
+        write = db.in_memory_db.save_task_change(column, task)
+    await _commit(write)
+    return task.to_dict()
 
 
 @router.delete("/column/{column}/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -187,30 +553,171 @@ async def delete_task_api(column: str, task_id: str):
     Deletes a task from a specific column.
     Returns a 204 No Content status on successful deletion.
     """
-    print(f"Delete API called for task {task_id} in column {column}")
-    
     if column not in db.in_memory_db.databases:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
 
-    initial_len = len(db.in_memory_db.databases[column])
-    print(f"Before delete: {column} has {initial_len} tasks")
-    
-    db.in_memory_db.databases[column] = [task for task in db.in_memory_db.databases[column] if task.id != task_id]
-    
-    final_len = len(db.in_memory_db.databases[column])
-    print(f"After delete: {column} has {final_len} tasks")
+    async with db.in_memory_db.lock_columns(column):
+        if db.in_memory_db.find_task(column, task_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
 
-    if final_len == initial_len:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
-    
-    # Auto-save to file
-    print("Calling save_current_state()...")
-    save_result = db.in_memory_db.save_current_state()
-    print(f"Save result: {save_result}")
+        db.in_memory_db.remove_task(task_id)
+        log_event(
+            logger, logging.INFO, "task_deleted", route="DELETE /tasks/column/{column}/{task_id}",
+            column=column, task_id=task_id, remaining=len(db.in_memory_db.databases[column]),
+        )
+
+        # Auto-save to file
+        write = db.in_memory_db.save_task_deletion(task_id)
+    await _commit(write)
 
     return
 
 
+@router.put("/move", response_model=Task)
+async def move_task_api(task_move: TaskMove):
+    """
+    Moves a single task within its column or to the other column.
+    Expects a JSON body with 'task_id', 'new_column' and 'new_order', where
+    'new_order' is the zero-based position in the target column.
+    Only the moved task is rewritten, so the cost doesn't grow with the board.
+    Returns the moved task.
+    """
+    if task_move.new_column not in db.in_memory_db.databases:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invalid column")
+
+    # The task may come from either column, so both are locked
+    async with db.in_memory_db.lock_columns():
+        result = db.in_memory_db.reposition_task(task_move.task_id, task_move.new_column, task_move.new_order)
+        if result is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+        task, respaced = result
+
+        # Auto-save to file; a respaced column changes every order in it
+        if respaced:
+            write = db.in_memory_db.mark_dirty(task_move.new_column)
+        else:
+            write = db.in_memory_db.save_task_change(task_move.new_column, task)
+    await _commit(write)
+    return task.to_dict()
+
+
+# Fields each batch operation needs besides task_id
+_BATCH_REQUIRED_FIELDS = {
+    "create": ("column", "text"),
+    "edit": ("text",),
+    "complete": ("completed",),
+    "ignore": ("ignored",),
+    "delete": (),
+    "move": ("new_column", "new_order"),
+}
+
+
+def _validate_batch(operations: List[BatchOperation]) -> List[dict]:
+    """
+    Checks every operation of a batch against the board as it will be when that
+    operation runs, taking earlier deletes and moves in the batch into account.
+    Returns one error (index, status, detail) per invalid operation.
+    """
+    errors = []
+    # Columns of tasks touched earlier in the batch; None once deleted
+    columns = {}
+
+    for index, operation in enumerate(operations):
+        missing = [field for field in _BATCH_REQUIRED_FIELDS[operation.op] if getattr(operation, field) is None]
+        if operation.op != "create" and operation.task_id is None:
+            missing.insert(0, "task_id")
+        if missing:
+            errors.append({"index": index, "status": status.HTTP_400_BAD_REQUEST, "detail": f"Missing fields: {', '.join(missing)}"})
+            continue
+
+        if operation.op == "create":
+            if operation.column not in db.in_memory_db.databases:
+                errors.append({"index": index, "status": status.HTTP_404_NOT_FOUND, "detail": "Invalid column"})
+            continue
+
+        if operation.task_id in columns:
+            column = columns[operation.task_id]
+        else:
+            entry = db.in_memory_db.get_task(operation.task_id)
+            column = entry[0] if entry else None
+        if column is None or (operation.column is not None and operation.column != column):
+            errors.append({"index": index, "status": status.HTTP_404_NOT_FOUND, "detail": "Task not found"})
+            continue
+
+        if operation.op == "move":
+            if operation.new_column not in db.in_memory_db.databases:
+                errors.append({"index": index, "status": status.HTTP_404_NOT_FOUND, "detail": "Invalid column"})
+                continue
+            columns[operation.task_id] = operation.new_column
+        elif operation.op == "delete":
+            columns[operation.task_id] = None
+
+    return errors
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def batch_api(batch: BatchRequest):
+    """
+    Applies an ordered list of create, edit, complete, ignore, delete and move
+    operations as one unit.
+    The whole batch is validated first; if any operation is invalid, nothing is
+    applied and a 400 error lists the failing operations. Otherwise every
+    operation is applied under the store lock and the changes are persisted
+    in a single write.
+    Returns the resulting task for each operation and the new board version.
+    """
+    # Validate and apply with every column locked, so the board can't change in between
+    async with db.in_memory_db.lock_columns():
+        errors = _validate_batch(batch.operations)
+        if errors:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"message": "Batch rejected, no operations were applied", "errors": errors},
+            )
+
+        results = []
+        records = []
+        respaced = set()
+        with db.in_memory_db.transaction():
+            for index, operation in enumerate(batch.operations):
+                if operation.op == "create":
+                    column = operation.column
+                    task = TaskRecord(str(uuid.uuid4()), operation.text, db.in_memory_db.next_order(column))
+                    db.in_memory_db.insert_task(column, task)
+                elif operation.op == "delete":
+                    db.in_memory_db.remove_task(operation.task_id)
+                    records.append(db.in_memory_db.task_deletion_record(operation.task_id))
+                    results.append({"index": index, "op": operation.op, "task_id": operation.task_id})
+                    continue
+                elif operation.op == "move":
+                    column = operation.new_column
+                    task, moved_respaced = db.in_memory_db.reposition_task(operation.task_id, column, operation.new_order)
+                    if moved_respaced:
+                        respaced.add(column)
+                else:
+                    column, task = db.in_memory_db.get_task(operation.task_id)
+                    if operation.op == "edit":
+                        db.in_memory_db.set_text(column, task, operation.text)
+                    elif operation.op == "complete":
+                        db.in_memory_db.set_completed(column, task, operation.completed)
+                    else:
+                        db.in_memory_db.set_ignored(column, task, operation.ignored)
+
+                records.append(db.in_memory_db.task_change_record(column, task))
+                # Convert now so later operations on the same task don't change this result
+                results.append({"index": index, "op": operation.op, "task_id": task.id, "task": task.to_dict()})
+            version = db.in_memory_db.version
+
+        # Auto-save to file; a respaced column changes every order in it. With
+        # shared storage the records hold the changes outside those columns.
+        write = db.in_memory_db.save_records(records)
+        if respaced:
+            write = db.in_memory_db.mark_dirty(*respaced)
+    await _commit(write)
+
+    return {"results": results, "version": version}
+
+
 @router.put("/bulk-update", response_model=dict)
 async def bulk_update_tasks_api(tasks_state: TasksState):
     """
@@ -218,44 +725,24 @@ async def bulk_update_tasks_api(tasks_state: TasksState):
     Frontend sends the complete ordered list of task IDs for both columns.
     Backend persists the new order without any reordering logic.
     """
-    print(f"Bulk update request - Signal: {tasks_state.signal}, Noise: {tasks_state.noise}")
-    
-    # Create a map of all existing tasks by ID for quick lookup
-    all_tasks = {}
-    for column_name, tasks in db.in_memory_db.databases.items():
-        for task in tasks:
-            all_tasks[task.id] = task
-    
-    # Validate that all task IDs exist
-    all_provided_ids = set(tasks_state.signal + tasks_state.noise)
-    all_existing_ids = set(all_tasks.keys())
-    
-    if all_provided_ids != all_existing_ids:
-        missing_ids = all_existing_ids - all_provided_ids
-        extra_ids = all_provided_ids - all_existing_ids
-        error_msg = f"Task ID mismatch. Missing: {missing_ids}, Extra: {extra_ids}"
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
-    
-    # Clear existing columns
-    db.in_memory_db.databases["signal"].clear()
-    db.in_memory_db.databases["noise"].clear()
-    
-    # Rebuild signal column with correct order
-    for i, task_id in enumerate(tasks_state.signal):
-        task = all_tasks[task_id]
-        task.order = i
-        db.in_memory_db.databases["signal"].append(task)
-    
-    # Rebuild noise column with correct order
-    for i, task_id in enumerate(tasks_state.noise):
-        task = all_tasks[task_id]
-        task.order = i
-        db.in_memory_db.databases["noise"].append(task)
-    
-    print(f"Bulk update completed - Signal: {len(tasks_state.signal)} tasks, Noise: {len(tasks_state.noise)} tasks")
-    
-    # Auto-save to file
-    db.in_memory_db.save_current_state()
+    async with db.in_memory_db.lock_columns():
+        # Validate that the IDs match the existing tasks, then rebuild both columns in the given order
+        mismatch = db.in_memory_db.reorder_columns(tasks_state.signal, tasks_state.noise)
+        if mismatch is not None:
+            missing_ids, extra_ids = mismatch
+            error_msg = f"Task ID mismatch. Missing: {missing_ids}, Extra: {extra_ids}"
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error_msg)
+
+        # The ID lists grow with the board, so they are only logged at DEBUG
+        log_event(
+            logger, logging.INFO, "bulk_update", route="PUT /tasks/bulk-update",
+            signal=len(tasks_state.signal), noise=len(tasks_state.noise),
+            debug={"signal_ids": tasks_state.signal, "noise_ids": tasks_state.noise},
+        )
+
+        # Auto-save to file
+        write = db.in_memory_db.mark_dirty()
+    await _commit(write)
     
     return {
         "message": "Bulk update completed successfully",
@@ -0,0 +1,55 @@
+"""
+Measures the memory held per task, comparing a pydantic Task per task with the
+store's TaskRecord, and the full store cost (columns plus id index) per task.
+Strings are created up front so the object figures exclude id and text data.
+
+Usage: python -m benchmarks.bench_memory [task_count]
+"""
+import gc
+import sys
+import tracemalloc
+import uuid
+
+from models.task import Task
+from db.ordered_column import OrderedColumn
+from db.task_record import TaskRecord
+
+
+def measure(build):
+    """Bytes allocated by build() that are still alive afterwards"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    texts = [f"Task number {i}" for i in range(count)]
+    _, string_bytes = measure(lambda: ([str(uuid.uuid4()) for _ in range(count)], [f"Task number {i}" for i in range(count)]))
+
+    models, model_bytes = measure(lambda: [Task(id=ids[i], text=texts[i], order=i) for i in range(count)])
+    del models
+    records, record_bytes = measure(lambda: [TaskRecord(ids[i], texts[i], i) for i in range(count)])
+
+    def build_store():
+        column = OrderedColumn(records)
+        index = {record.id: ("signal", record) for record in records}
+        return column, index
+
+    store, store_bytes = measure(build_store)
+
+    print(f"{count} tasks, Python {sys.version.split()[0]}")
+    print(f"  pydantic Task object:       {model_bytes / count:7.1f} bytes/task")
+    print(f"  TaskRecord object:          {record_bytes / count:7.1f} bytes/task")
+    print(f"  store structures per task:  {store_bytes / count:7.1f} bytes/task (ordered column + id index)")
+    print(f"  id + text strings (approx): {string_bytes / count:7.1f} bytes/task")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Measures the search index: build time, memory per task, incremental updates
+and query latency. Task texts are five words drawn from a 50,000-word
+vocabulary, with a handful of common words mixed in.
+
+Usage: python -m benchmarks.bench_search [task_count]
+"""
+import gc
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from db.search_index import SearchIndex
+from db.task_record import TaskRecord
+
+COMMON_WORDS = ["buy", "milk", "call", "email", "report", "review", "fix", "bug", "meeting", "plan"]
+
+
+def timed(func, repeat: int = 1) -> float:
+    """Average milliseconds per call of func()"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(1)
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9))) for _ in range(50_000)]
+    records = [
+        TaskRecord(str(i), " ".join(rng.choice(COMMON_WORDS) if rng.random() < 0.3 else rng.choice(words) for _ in range(5)), i)
+        for i in range(count)
+    ]
+
+    # Memory is measured on a separate build, since tracing slows it down
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    traced = SearchIndex()
+    traced.rebuild(records)
+    index_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del traced
+
+    index = SearchIndex()
+    build_ms = timed(lambda: index.rebuild(records))
+
+    print(f"{count} tasks, Python {sys.version.split()[0]}")
+    print(f"  build:   {build_ms / 1000:7.2f} s, {index_bytes / count:.0f} bytes/task")
+
+    added = [TaskRecord(f"new-{i}", f"new task {rng.choice(words)}", 0) for i in range(10_000)]
+    add_ms = timed(lambda: [index.add(record) for record in added])
+    remove_ms = timed(lambda: [index.remove(record.id) for record in added])
+    print(f"  add:     {add_ms * 1000 / len(added):7.1f} us/task")
+    print(f"  remove:  {remove_ms * 1000 / len(added):7.1f} us/task")
+
+    word = next(word for word in words if len(word) > 6)
+    queries = [word, word[:3], "buy " + word, "rev", "buy milk"]
+    for query in queries:
+        matches = len(index.search(query))
+        print(f"  search {query!r:>16}: {timed(lambda: index.search(query), 20):7.2f} ms ({matches} matches)")
+
+
+if __name__ == "__main__":
+    main()
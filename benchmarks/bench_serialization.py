@@ -0,0 +1,76 @@
+"""
+Compares the old and new serialization paths for a column read and a snapshot save.
+
+Old column read: pydantic Task models revalidated through the TaskList response
+model and dumped to JSON, as FastAPI does for a response_model route.
+Old save: task.dict() per task and json.dump with indent=2.
+New: encode_page() / encode_columns() straight from TaskRecords.
+
+Usage: python -m benchmarks.bench_serialization [task_count ...]
+Defaults to 10000 and 100000; pass 1000000 to include the million-task case.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from pydantic import TypeAdapter
+
+from db import serialization
+from db.serialization import encode_columns, encode_page
+from db.task_record import TaskRecord
+from models.task import TaskList
+
+
+def timed(fn):
+    """Seconds taken by fn(), best of three runs"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    encoder = "orjson" if serialization.orjson is not None else "standard library"
+    print(f"New path encoder: {encoder}")
+    adapter = TypeAdapter(TaskList)
+
+    for count in counts:
+        records = [TaskRecord(str(uuid.uuid4()), f"Task number {i}", i * 1024, i % 3 == 0, i % 7 == 0) for i in range(count)]
+        models = [record.to_model() for record in records]
+        half = count // 2
+
+        def old_read():
+            validated = adapter.validate_python({"tasks": models})
+            json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+        def new_read():
+            encode_page(records, None)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tasks_data.json")
+
+            def old_save():
+                data = {"signal": [task.model_dump() for task in models[:half]], "noise": [task.model_dump() for task in models[half:]]}
+                with open(path, "w") as f:
+                    json.dump(data, f, indent=2)
+
+            def new_save():
+                with open(path, "wb") as f:
+                    f.write(encode_columns(records[:half], records[half:]))
+
+            old_read_s, new_read_s = timed(old_read), timed(new_read)
+            old_save_s, new_save_s = timed(old_save), timed(new_save)
+
+        print(f"{count} tasks")
+        print(f"  column read: {old_read_s * 1000:9.1f} ms -> {new_read_s * 1000:8.1f} ms ({old_read_s / new_read_s:.1f}x)")
+        print(f"  save:        {old_save_s * 1000:9.1f} ms -> {new_save_s * 1000:8.1f} ms ({old_save_s / new_save_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compact binary snapshot format for the task store.
+
+Layout (little-endian):
+    header   magic b"SVNTASK1", signal count (u32), noise count (u32), heap offset (u64)
+    records  one fixed 32-byte record per task, signal column first, then noise:
+             order (i64), heap offset (u64), id length (u32), text length (u32),
+             flags (u8), 7 bytes padding
+    heap     UTF-8 id and text of every task, back to back
+
+Records have a fixed size, so they are unpacked in one pass with
+struct.iter_unpack from the mmap-ed file, without any JSON parsing.
+
+Convert to and from the JSON data file with:
+    python -m db.binary_snapshot to-binary tasks_data.json tasks_data.bin
+    python -m db.binary_snapshot to-json tasks_data.bin tasks_data.json
+"""
+import argparse
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, List, Sequence
+
+from db.serialization import encode_columns, loads
+from db.task_record import TaskRecord
+
+MAGIC = b"SVNTASK1"
+HEADER = struct.Struct("<8sIIQ")
+RECORD = struct.Struct("<qQIIB7x")
+
+COLUMNS = ("signal", "noise")
+
+
+def write_binary_snapshot(path: str, signal_tasks: Sequence[TaskRecord], noise_tasks: Sequence[TaskRecord]):
+    """Write both columns to path in the binary snapshot format, and flush it to disk"""
+    records = bytearray()
+    heap = bytearray()
+    for tasks in (signal_tasks, noise_tasks):
+        for task in tasks:
+            task_id = task.id.encode()
+            text = task.text.encode()
+            records += RECORD.pack(task.order, len(heap), len(task_id), len(text), task.flags)
+            heap += task_id
+            heap += text
+
+    heap_offset = HEADER.size + len(records)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(signal_tasks), len(noise_tasks), heap_offset))
+        f.write(records)
+        f.write(heap)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_binary_snapshot(path: str) -> Dict[str, List[TaskRecord]]:
+    """
+    Decode every task of a binary snapshot, straight from the mapped file.
+    Raises ValueError when the file isn't a binary task snapshot.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, signal_count, noise_count, heap_offset = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a binary task snapshot")
+        tasks = []
+        for order, offset, id_length, text_length, flags in RECORD.iter_unpack(
+            data[HEADER.size:HEADER.size + (signal_count + noise_count) * RECORD.size]
+        ):
+            start = heap_offset + offset
+            middle = start + id_length
+            record = TaskRecord(data[start:middle].decode(), data[middle:middle + text_length].decode(), order)
+            record.flags = flags
+            tasks.append(record)
+    return {"signal": tasks[:signal_count], "noise": tasks[signal_count:]}
+
+
+def json_to_binary(json_path: str, binary_path: str):
+    """Convert a tasks_data.json file to the binary snapshot format"""
+    with open(json_path, "rb") as f:
+        data = loads(f.read())
+    columns = {name: [TaskRecord.from_dict(task) for task in data.get(name, [])] for name in COLUMNS}
+    write_binary_snapshot(binary_path, columns["signal"], columns["noise"])
+
+
+def binary_to_json(binary_path: str, json_path: str):
+    """Convert a binary snapshot back to the tasks_data.json format"""
+    columns = read_binary_snapshot(binary_path)
+    with open(json_path, "wb") as f:
+        f.write(encode_columns(columns["signal"], columns["noise"]))
+
+
+def main(argv: Iterable[str] = None):
+    parser = argparse.ArgumentParser(description="Convert task snapshots between JSON and the binary format")
+    parser.add_argument("direction", choices=["to-binary", "to-json"])
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    args = parser.parse_args(argv)
+
+    if args.direction == "to-binary":
+        json_to_binary(args.source, args.destination)
+    else:
+        binary_to_json(args.source, args.destination)
+    print(f"Wrote {args.destination} ({os.path.getsize(args.destination)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+from typing import Optional, Set
+from db.serialization import dumps
+
+# Queued in place of the backlog when a subscriber falls too far behind; the
+# client has to resync when it reaches it
+RESYNC = object()
+
+# Queued in place of further events when a subscriber has been evicted
+EVICTED = object()
+
+
+class Subscriber:
+    """One connected client: a bounded queue of encoded events"""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.evicted = False
+        # When a RESYNC marker was queued that the client hasn't reached yet
+        self.resync_pending_since: Optional[float] = None
+        # The task streaming to the client, cancelled on eviction in case it is
+        # stuck sending to a client that stopped reading
+        self.task: Optional[asyncio.Task] = None
+
+    def resynced(self):
+        """Note that the client has been sent the pending resync"""
+        self.resync_pending_since = None
+
+
+class Broadcaster:
+    """
+    Fans store changes out to every connected client.
+    Each event is encoded once, as a Server-Sent Events message, and the same
+    bytes are queued for every subscriber. When a subscriber's queue is full,
+    its backlog is replaced by a single RESYNC marker and further events are
+    dropped until it reaches the marker, so a burst never grows the queue.
+    A subscriber still stuck behind its marker `evict_after` seconds later is
+    evicted, instead of slowing down the others.
+    publish() may be called from any thread.
+    """
+
+    def __init__(self, queue_size: int, evict_after: float):
+        self._queue_size = queue_size
+        self._evict_after = evict_after
+        self._subscribers: Set[Subscriber] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> Subscriber:
+        """Register a new subscriber. Call from the event loop"""
+        subscriber = Subscriber(self._queue_size)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Forget a subscriber once its connection has closed"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event: str, data: dict, event_id: Optional[str] = None):
+        """Queue an event for every subscriber"""
+        if not self._subscribers:
+            return
+        message = encode_event(event, data, event_id)
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(message)
+        elif loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._deliver, message)
+
+    def _deliver(self, message: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        now = time.monotonic()
+        for subscriber in subscribers:
+            if subscriber.evicted:
+                continue
+            if subscriber.resync_pending_since is not None:
+                # The resync covers this event; evict a client that isn't getting to it
+                if now - subscriber.resync_pending_since > self._evict_after:
+                    self._evict(subscriber)
+                continue
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                subscriber.resync_pending_since = now
+                self._replace_backlog(subscriber, RESYNC)
+
+    def _evict(self, subscriber: Subscriber):
+        subscriber.evicted = True
+        self.unsubscribe(subscriber)
+        self._replace_backlog(subscriber, EVICTED)
+        if subscriber.task is not None:
+            subscriber.task.cancel()
+
+    def _replace_backlog(self, subscriber: Subscriber, marker):
+        """Drop the queued events of a subscriber and leave only the given marker"""
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(marker)
+
+
+def encode_event(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    """Encode one Server-Sent Events message"""
+    head = b"id: " + event_id.encode() + b"\n" if event_id is not None else b""
+    return head + b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
@@ -0,0 +1,136 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from db.serialization import dumps
+from db.task_record import TaskRecord
+
+# Export formats: format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "markdown": ("text/markdown; charset=utf-8", "md"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+# Column order and headings used by every format
+COLUMN_TITLES = {"signal": "Signal", "noise": "Noise"}
+
+CSV_FIELDS = ["column", "id", "text", "completed", "ignored", "order"]
+
+# A column, read in chunks of tasks
+ColumnChunks = Tuple[str, Iterable[List[TaskRecord]]]
+
+
+def _markdown_line(task: TaskRecord) -> str:
+    # Markdown list items are single lines; ignored tasks are struck through
+    text = " ".join(task.text.splitlines())
+    if task.ignored:
+        text = f"~~{text}~~"
+    return f"- [{'x' if task.completed else ' '}] {text}\n"
+
+
+def render_markdown(columns: Iterable[ColumnChunks]) -> Iterator[bytes]:
+    """Render the board as a Markdown checklist with one heading per column"""
+    first = True
+    for column, chunks in columns:
+        heading = f"# {COLUMN_TITLES.get(column, column)}\n\n"
+        yield (heading if first else "\n" + heading).encode()
+        first = False
+        for chunk in chunks:
+            yield "".join(map(_markdown_line, chunk)).encode()
+
+
+def render_csv(columns: Iterable[ColumnChunks]) -> Iterator[bytes]:
+    """Render the board as CSV with a header row and one row per task"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(CSV_FIELDS)
+    yield buffer.getvalue().encode()
+    for column, chunks in columns:
+        for chunk in chunks:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (column, task.id, task.text, "true" if task.completed else "false", "true" if task.ignored else "false", task.order)
+                for task in chunk
+            )
+            yield buffer.getvalue().encode()
+
+
+def render_ndjson(columns: Iterable[ColumnChunks]) -> Iterator[bytes]:
+    """Render the board as one JSON object per line: the task fields plus its column"""
+    for column, chunks in columns:
+        for chunk in chunks:
+            yield b"".join(dumps({"column": column, **task.to_dict()}) + b"\n" for task in chunk)
+
+
+RENDERERS: Dict[str, Callable[[Iterable[ColumnChunks]], Iterator[bytes]]] = {
+    "markdown": render_markdown,
+    "csv": render_csv,
+    "ndjson": render_ndjson,
+}
+
+
+class ExportCache:
+    """
+    The last rendered export of each format, kept in a temporary directory on
+    disk along with the board version it shows. Exports are written to the
+    cache while they are streamed, so nothing is held in memory, and only kept
+    when the board didn't change during the download.
+    """
+
+    def __init__(self):
+        self._dir: Optional[str] = None
+        # format -> version tag of the cached file
+        self._tags: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, format: str) -> str:
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="tasks-export-")
+        return os.path.join(self._dir, f"export.{EXPORT_FORMATS[format][1]}")
+
+    def get(self, format: str, tag: str) -> Optional[str]:
+        """The path of the cached export if it shows the board at `tag`, otherwise None"""
+        with self._lock:
+            if self._tags.get(format) != tag:
+                return None
+            path = self._path(format)
+        return path if os.path.exists(path) else None
+
+    def store(self, format: str, tag: str, chunks: Iterable[bytes], current_tag: Callable[[], str]) -> Iterator[bytes]:
+        """
+        Pass the chunks of an export through, writing them to the cache as well.
+        The file is cached for `tag` once the export completes, if current_tag()
+        still returns it then.
+        """
+        with self._lock:
+            path = self._path(format)
+        tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False)
+        try:
+            with tmp:
+                for chunk in chunks:
+                    tmp.write(chunk)
+                    yield chunk
+            if current_tag() == tag:
+                with self._lock:
+                    os.replace(tmp.name, path)
+                    self._tags[format] = tag
+        finally:
+            if os.path.exists(tmp.name):
+                os.remove(tmp.name)
+
+    def clear(self):
+        """Remove every cached export"""
+        with self._lock:
+            if self._dir is not None:
+                shutil.rmtree(self._dir, ignore_errors=True)
+                self._dir = None
+            self._tags.clear()
+
+
+# Shared by the export route
+cache = ExportCache()
@@ -1,64 +1,217 @@
-import json
+import logging
 import os
 from typing import Dict, List
-from models.task import Task
+from db.binary_snapshot import read_binary_snapshot, write_binary_snapshot
+from db.log import get_logger, log_event
+from db.serialization import dumps, encode_columns, loads
+from db.task_record import TaskRecord
 
 # Path to store the task data
 DATA_FILE = "tasks_data.json"
 
-def save_tasks_to_file(signal_tasks: List[Task], noise_tasks: List[Task]) -> bool:
+# Path to store the task data in the binary snapshot format (see db/binary_snapshot.py)
+BINARY_DATA_FILE = "tasks_data.bin"
+
+# "json" writes snapshots to DATA_FILE, "binary" to BINARY_DATA_FILE
+SNAPSHOT_FORMAT = os.environ.get("TASKS_SNAPSHOT_FORMAT", "json")
+
+# Path to the append-only write-ahead log replayed on top of DATA_FILE
+WAL_FILE = "tasks_data.wal"
+
+# "wal" appends one record per mutation, "snapshot" rewrites DATA_FILE every time
+PERSISTENCE_MODE = os.environ.get("TASKS_PERSISTENCE_MODE", "wal")
+
+# Number of log records after which the log is folded back into a fresh snapshot
+WAL_COMPACT_THRESHOLD = int(os.environ.get("TASKS_WAL_COMPACT_THRESHOLD", "1000"))
+
+# Number of records currently in WAL_FILE (set on load, bumped on append)
+_wal_record_count = 0
+
+logger = get_logger("storage")
+
+def save_tasks_to_file(signal_tasks: List[TaskRecord], noise_tasks: List[TaskRecord]) -> bool:
     """
-    Save tasks to a local JSON file.
+    Save tasks to a local JSON file, or to the binary snapshot file when
+    SNAPSHOT_FORMAT is "binary". The other format's file is removed, so a
+    stale copy is never loaded after switching formats back.
+    The JSON is encoded straight from the records, without indentation.
+    The snapshot is on disk, under its final name, by the time this returns.
     Returns True if successful, False otherwise.
     """
     try:
-        print(f"save_tasks_to_file called with {len(signal_tasks)} signal tasks, {len(noise_tasks)} noise tasks")
-        data = {
-            "signal": [task.dict() for task in signal_tasks],
-            "noise": [task.dict() for task in noise_tasks]
-        }
-        
-        print(f"About to write to {DATA_FILE}")
-        with open(DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        print("Successfully wrote to file")
+        data_file = BINARY_DATA_FILE if SNAPSHOT_FORMAT == "binary" else DATA_FILE
+
+        # Write to a temporary file first so a crash never leaves a half-written snapshot
+        tmp_file = data_file + ".tmp"
+        if SNAPSHOT_FORMAT == "binary":
+            write_binary_snapshot(tmp_file, signal_tasks, noise_tasks)
+        else:
+            with open(tmp_file, 'wb') as f:
+                f.write(encode_columns(signal_tasks, noise_tasks))
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_file, data_file)
+        other_file = DATA_FILE if data_file == BINARY_DATA_FILE else BINARY_DATA_FILE
+        if os.path.exists(other_file):
+            os.remove(other_file)
+        _fsync_directory(data_file)
+
+        log_event(logger, logging.DEBUG, "snapshot_written", file=data_file, signal=len(signal_tasks), noise=len(noise_tasks))
         return True
     except Exception as e:
-        print(f"Error saving tasks to file: {e}")
+        log_event(logger, logging.ERROR, "snapshot_failed", error=str(e))
         return False
 
-def load_tasks_from_file() -> Dict[str, List[Task]]:
+def _fsync_directory(path: str):
+    """Flush the directory holding path, so a file created, renamed or removed there stays that way"""
+    if os.name == "nt":
+        # Windows can't open a directory, and commits renames without help
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def load_tasks_from_file() -> Dict[str, List[TaskRecord]]:
     """
-    Load tasks from the local JSON file.
+    Load tasks from the snapshot file and replay the write-ahead log on top.
+    Either snapshot format is read, so switching formats picks up the existing data.
     Returns dictionary with signal and noise task lists.
     If file doesn't exist or is invalid, returns empty lists.
     """
+    global _wal_record_count
     try:
-        if not os.path.exists(DATA_FILE):
-            return {"signal": [], "noise": []}
-        
-        with open(DATA_FILE, 'r') as f:
-            data = json.load(f)
-        
-        signal_tasks = [Task(**task_data) for task_data in data.get("signal", [])]
-        noise_tasks = [Task(**task_data) for task_data in data.get("noise", [])]
-        
-        return {"signal": signal_tasks, "noise": noise_tasks}
-    
+        snapshot = _read_snapshot()
+        columns = {
+            "signal": {task.id: task for task in snapshot["signal"]},
+            "noise": {task.id: task for task in snapshot["noise"]},
+        }
+        _wal_record_count = replay_wal(columns)
+
+        return {"signal": list(columns["signal"].values()), "noise": list(columns["noise"].values())}
+
     except Exception as e:
-        print(f"Error loading tasks from file: {e}")
+        log_event(logger, logging.ERROR, "load_failed", error=str(e))
         return {"signal": [], "noise": []}
 
+def _read_snapshot() -> Dict[str, List[TaskRecord]]:
+    """
+    Read the newest snapshot file of either format, preferring SNAPSHOT_FORMAT
+    on a tie; empty columns when there is none
+    """
+    paths = [path for path in (BINARY_DATA_FILE, DATA_FILE) if os.path.exists(path)]
+    if not paths:
+        return {"signal": [], "noise": []}
+    preferred = BINARY_DATA_FILE if SNAPSHOT_FORMAT == "binary" else DATA_FILE
+    path = max(paths, key=lambda path: (os.path.getmtime(path), path == preferred))
+
+    if path == BINARY_DATA_FILE:
+        return read_binary_snapshot(path)
+    # Read as bytes: the files are UTF-8 whatever the locale's encoding is
+    with open(path, 'rb') as f:
+        data = loads(f.read())
+    return {
+        "signal": [TaskRecord.from_dict(task_data) for task_data in data.get("signal", [])],
+        "noise": [TaskRecord.from_dict(task_data) for task_data in data.get("noise", [])],
+    }
+
+def append_to_wal(records: List[dict]) -> bool:
+    """
+    Append mutation records to the write-ahead log, one compact JSON line each.
+    Supported records are {"op": "put", "column", "task"}, {"op": "delete", "id"}
+    and {"op": "clear"}. The records are on disk by the time this returns.
+    Returns True if successful, False otherwise.
+    """
+    global _wal_record_count
+    try:
+        lines = b"".join(dumps(record) + b"\n" for record in records)
+        created = not os.path.exists(WAL_FILE)
+        with open(WAL_FILE, 'ab') as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        if created:
+            _fsync_directory(WAL_FILE)
+        _wal_record_count += len(records)
+        return True
+    except Exception as e:
+        log_event(logger, logging.ERROR, "wal_append_failed", error=str(e))
+        return False
+
+def replay_wal(columns: Dict[str, Dict[str, dict]]) -> int:
+    """
+    Apply the records in the write-ahead log to columns (column -> id -> TaskRecord).
+    A truncated trailing line left by an interrupted append is skipped.
+    Returns the number of records applied.
+    """
+    if not os.path.exists(WAL_FILE):
+        return 0
+
+    applied = 0
+    with open(WAL_FILE, 'rb') as f:
+        for line in f:
+            try:
+                record = loads(line)
+            except ValueError:
+                log_event(logger, logging.WARNING, "wal_record_skipped", file=WAL_FILE)
+                continue
+
+            op = record.get("op")
+            if op == "put":
+                task_data = record["task"]
+                for tasks in columns.values():
+                    tasks.pop(task_data["id"], None)
+                columns[record["column"]][task_data["id"]] = TaskRecord.from_dict(task_data)
+            elif op == "delete":
+                for tasks in columns.values():
+                    tasks.pop(record["id"], None)
+            elif op == "clear":
+                for tasks in columns.values():
+                    tasks.clear()
+            applied += 1
+    return applied
+
+def wal_needs_compaction() -> bool:
+    """Whether the write-ahead log has grown past WAL_COMPACT_THRESHOLD records"""
+    return _wal_record_count >= WAL_COMPACT_THRESHOLD
+
+def compact_wal(signal_tasks: List[TaskRecord], noise_tasks: List[TaskRecord]) -> bool:
+    """
+    Fold the write-ahead log into a fresh snapshot of the given tasks.
+    The log is only truncated once the snapshot has reached disk, and replaying
+    records on top of a snapshot that already holds them changes nothing, so a
+    crash in between still loads the same tasks.
+    Returns True if successful, False otherwise.
+    """
+    global _wal_record_count
+    if not save_tasks_to_file(signal_tasks, noise_tasks):
+        return False
+
+    try:
+        with open(WAL_FILE, 'wb') as f:
+            os.fsync(f.fileno())
+        _wal_record_count = 0
+        return True
+    except Exception as e:
+        log_event(logger, logging.ERROR, "wal_truncate_failed", error=str(e))
+        return False
+
 def clear_file_data() -> bool:
     """
-    Clear the data file by removing it.
+    Clear the data files and the write-ahead log by removing them.
     Returns True if successful, False otherwise.
     """
+    global _wal_record_count
     try:
         if os.path.exists(DATA_FILE):
             os.remove(DATA_FILE)
+        if os.path.exists(BINARY_DATA_FILE):
+            os.remove(BINARY_DATA_FILE)
+        if os.path.exists(WAL_FILE):
+            os.remove(WAL_FILE)
+        _wal_record_count = 0
         return True
     except Exception as e:
-        print(f"Error clearing file data: {e}")
-        return False
\ No newline at end of file
+        log_event(logger, logging.ERROR, "clear_failed", error=str(e))
+        return False
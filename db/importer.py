@@ -0,0 +1,187 @@
+import csv
+import io
+import os
+import re
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+from db.serialization import loads
+from db.task_record import TaskRecord
+
+# Import formats accepted by POST /tasks/import, by file extension
+IMPORT_EXTENSIONS = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+# Number of rows validated and turned into records at a time
+IMPORT_CHUNK_SIZE = 10000
+
+# Parsing stops after this many invalid rows
+MAX_IMPORT_ERRORS = 20
+
+# A row read from the file, before validation: (line number, fields), where
+# fields holds "column" (None for the default column), "text", "completed" and
+# "ignored" as found, or is a string saying why the line couldn't be read
+ImportRow = Tuple[int, Union[dict, str]]
+
+_CHECKLIST_ITEM = re.compile(r"^\s*[-*+]\s+(?:\[([ xX])\]\s+)?(.*?)\s*$")
+_HEADING = re.compile(r"^\s*#{1,6}\s+(.*?)\s*#*\s*$")
+_STRUCK = re.compile(r"^~~(.+)~~$")
+
+_TRUE = {"true", "1", "yes", "x"}
+_FALSE = {"false", "0", "no", ""}
+
+
+class InvalidImport(Exception):
+    """An upload that can't be read in the requested format"""
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """The import format implied by a file name, or None when it isn't recognised"""
+    if not filename:
+        return None
+    return IMPORT_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def _markdown_rows(lines: Iterator[str], columns: List[str]) -> Iterator[ImportRow]:
+    # List items become tasks, in the column named by the heading above them
+    # (the default column under any other heading)
+    column = None
+    for number, line in enumerate(lines, 1):
+        heading = _HEADING.match(line)
+        if heading:
+            title = heading.group(1).lower()
+            column = title if title in columns else None
+            continue
+        item = _CHECKLIST_ITEM.match(line)
+        if item is None or not item.group(2):
+            continue
+        text = item.group(2)
+        struck = _STRUCK.match(text)
+        if struck:
+            text = struck.group(1)
+        yield number, {"column": column, "text": text, "completed": item.group(1) in ("x", "X"), "ignored": struck is not None}
+
+
+def _csv_rows(lines: Iterator[str], columns: List[str]) -> Iterator[ImportRow]:
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None or "text" not in reader.fieldnames:
+        raise InvalidImport("CSV header must include a 'text' field")
+    for row in reader:
+        row["column"] = row.get("column") or None
+        yield reader.line_num, row
+
+
+def _ndjson_rows(lines: Iterator[str], columns: List[str]) -> Iterator[ImportRow]:
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = loads(line)
+        except ValueError:
+            yield number, "invalid JSON"
+            continue
+        yield number, data if isinstance(data, dict) else "not a JSON object"
+
+
+_ROW_READERS = {
+    "markdown": _markdown_rows,
+    "csv": _csv_rows,
+    "ndjson": _ndjson_rows,
+}
+
+
+def _flag(value) -> Optional[bool]:
+    """A boolean from a JSON bool or a CSV cell. Returns None when it isn't one"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in _TRUE:
+            return True
+        if value in _FALSE:
+            return False
+    return None
+
+
+def _new_ids(count: int) -> List[str]:
+    """
+    `count` random version 4 UUIDs in their string form, like str(uuid.uuid4())
+    but drawing the random bytes for all of them at once.
+    """
+    data = bytearray(os.urandom(16 * count))
+    ids = []
+    for i in range(0, len(data), 16):
+        data[i + 6] = data[i + 6] & 0x0F | 0x40
+        data[i + 8] = data[i + 8] & 0x3F | 0x80
+        h = data[i:i + 16].hex()
+        ids.append(f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}")
+    return ids
+
+
+def _validate_chunk(
+    rows: List[ImportRow], default_column: str, tasks: Dict[str, List[TaskRecord]], errors: List[dict]
+):
+    """Turn valid rows into records appended to `tasks`, listing the others in `errors`"""
+    ids = iter(_new_ids(len(rows)))
+    for number, fields in rows:
+        if isinstance(fields, str):
+            errors.append({"line": number, "error": fields})
+            if len(errors) >= MAX_IMPORT_ERRORS:
+                return
+            continue
+        column = fields.get("column")
+        column = default_column if column is None else column
+        text = fields.get("text")
+        completed = _flag(fields.get("completed", False))
+        ignored = _flag(fields.get("ignored", False))
+        if not isinstance(text, str) or not text.strip():
+            error = "missing text"
+        elif not isinstance(column, str) or column not in tasks:
+            error = f"unknown column {column!r}"
+        elif completed is None or ignored is None:
+            error = "completed and ignored must be true or false"
+        else:
+            tasks[column].append(TaskRecord(next(ids), text, 0, completed, ignored))
+            continue
+        errors.append({"line": number, "error": error})
+        if len(errors) >= MAX_IMPORT_ERRORS:
+            return
+
+
+def parse_tasks(file: BinaryIO, format: str, default_column: str, columns: List[str]) -> Tuple[Dict[str, List[TaskRecord]], List[dict]]:
+    """
+    Read tasks from an uploaded file, a line at a time, validating them in
+    chunks of IMPORT_CHUNK_SIZE rows. Rows without a column go to default_column.
+    The new records get fresh ids; their orders are assigned when they are added.
+    This blocks, so run it off the event loop.
+    Returns the records per column, in file order, and the errors found (at
+    most MAX_IMPORT_ERRORS, each {"line", "error"}).
+    Raises InvalidImport when the file isn't valid UTF-8 or lacks a CSV header.
+    """
+    tasks: Dict[str, List[TaskRecord]] = {column: [] for column in columns}
+    errors: List[dict] = []
+    # utf-8-sig drops the byte order mark some editors write
+    lines = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        rows = _ROW_READERS[format](lines, columns)
+        chunk: List[ImportRow] = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == IMPORT_CHUNK_SIZE:
+                _validate_chunk(chunk, default_column, tasks, errors)
+                chunk = []
+                if len(errors) >= MAX_IMPORT_ERRORS:
+                    break
+        else:
+            _validate_chunk(chunk, default_column, tasks, errors)
+    except UnicodeDecodeError:
+        raise InvalidImport("File is not valid UTF-8")
+    except csv.Error as e:
+        raise InvalidImport(f"Invalid CSV: {e}")
+    finally:
+        # Leave the upload open for the caller to close
+        lines.detach()
+    return tasks, errors
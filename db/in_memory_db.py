@@ -1,45 +1,609 @@
-from typing import List
-from models.task import Task
-from db.file_persistence import load_tasks_from_file, save_tasks_to_file
+import asyncio
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import AsyncExitStack, asynccontextmanager
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from db.task_record import TaskRecord
+from db import export
+from db.broadcaster import Broadcaster
+from db.log import get_logger, log_event
+from db.ordered_column import OrderedColumn, order_key
+from db.persistence_worker import PersistenceWorker
+from db.search_index import SearchIndex
+from db.storage import create_storage_engine
 
-# Load existing data from file on startup
-_loaded_data = load_tasks_from_file()
+# Quiet period after the last mutation before pending changes are written
+FLUSH_DEBOUNCE_SECONDS = float(os.environ.get("TASKS_FLUSH_DEBOUNCE_MS", "50")) / 1000
+
+# Upper bound on how long a mutation may wait for its write during a sustained burst
+FLUSH_MAX_LATENCY_SECONDS = float(os.environ.get("TASKS_FLUSH_MAX_LATENCY_MS", "500")) / 1000
+
+# When enabled, mutating requests only reply once their change has been written
+DURABLE_WRITES = os.environ.get("TASKS_DURABLE_WRITES", "0") == "1"
+
+# Maximum number of threads running blocking storage work for the routes
+IO_THREADS = int(os.environ.get("TASKS_IO_THREADS", "4"))
+
+# Number of recent changes kept for clients syncing through GET /tasks/changes
+CHANGE_LOG_SIZE = int(os.environ.get("TASKS_CHANGE_LOG_SIZE", "1000"))
+
+# Number of events a client of GET /tasks/events may fall behind before it has to resync
+EVENT_QUEUE_SIZE = int(os.environ.get("TASKS_EVENT_QUEUE_SIZE", "256"))
+
+# Seconds a client that fell behind gets to catch up before it is disconnected
+EVENT_EVICT_SECONDS = float(os.environ.get("TASKS_EVENT_EVICT_SECONDS", "10"))
+
+logger = get_logger("store")
+
+# Storage engine selected with TASKS_STORAGE_ENGINE (see db/storage.py)
+storage = create_storage_engine()
 
 # In-memory "Database" for Signal tasks
-# This list will hold Task objects for the "Signal" column.
-# Now loads from file on startup if available.
-signal_tasks_db: List[Task] = _loaded_data["signal"]
+# This column holds TaskRecord objects for the "Signal" column, kept in `order` sequence.
+# Filled from storage by load_data() during startup.
+signal_tasks_db = OrderedColumn()
 
 # In-memory "Database" for Noise tasks
-# This list will hold Task objects for the "Noise" column.
-# Now loads from file on startup if available.
-noise_tasks_db: List[Task] = _loaded_data["noise"]
+# This column holds TaskRecord objects for the "Noise" column, kept in `order` sequence.
+# Filled from storage by load_data() during startup.
+noise_tasks_db = OrderedColumn()
 
-# A dictionary to easily access the task lists by column name
+# A dictionary to easily access the task columns by column name
+# Treat the columns as read-only and mutate through the store functions below,
+# which keep the id index in sync.
 databases = {
     "signal": signal_tasks_db,
     "noise": noise_tasks_db,
 }
 
+# Distance between the orders of neighbouring tasks. The gaps let a task be
+# moved between two others by changing only its own order.
+ORDER_STEP = 1024
+
+# Index of every task by id: task_id -> (column, task)
+task_index: Dict[str, Tuple[str, TaskRecord]] = {}
+
+# Full-text index over the text of the tasks in each column, kept in sync by the
+# store functions below
+search_indexes = {column: SearchIndex() for column in databases}
+
+# Guards the columns against the persistence worker reading them mid-mutation
+_lock = threading.RLock()
+
+# One lock per column, held by the routes while they change that column. A route
+# that awaits in the middle of a change (clearing, reloading) holds them across
+# the await, so no other request can interleave with it.
+column_locks = {column: asyncio.Lock() for column in databases}
+
+# Bounded pool for blocking storage calls made from the routes
+io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="tasks-io")
+
+@asynccontextmanager
+async def lock_columns(*columns: str):
+    """
+    Hold the locks of the given columns, or of every column when none are given.
+    Locks are always taken in the order of `databases`, so requests locking
+    several columns can't deadlock each other.
+    """
+    async with AsyncExitStack() as stack:
+        for column in databases:
+            if not columns or column in columns:
+                await stack.enter_async_context(column_locks[column])
+        yield
+
+async def run_io(func, *args):
+    """Run a blocking call on io_executor. Returns its result"""
+    return await asyncio.get_running_loop().run_in_executor(io_executor, func, *args)
+
+# Board version, bumped by every mutation. It restarts at zero with the process,
+# so board_epoch tells versions from different runs apart.
+version = 0
+board_epoch = uuid.uuid4().hex[:12]
+
+# Recent changes, oldest first. Each one bumped the version by one, so their
+# versions are consecutive: {"version", "op", "id", "column", "task"}, with op
+# one of "insert", "update", "move" (column is the new one) and "delete"
+# (column is the old one, task is None).
+change_log: deque = deque(maxlen=CHANGE_LOG_SIZE)
+
+# Pushes every logged change to the clients of GET /tasks/events
+broadcaster = Broadcaster(EVENT_QUEUE_SIZE, EVENT_EVICT_SECONDS)
+
+# Versions up to this one can't be synced from the change log, because a
+# change too broad to log (replacing or respacing a column) came after them
+_change_floor = 0
+
+def _record_change(op: str, column: str, task: TaskRecord):
+    """Bump the version and log the change that produced it"""
+    global version
+    version += 1
+    change = {
+        "version": version,
+        "op": op,
+        "id": task.id,
+        "column": column,
+        "task": None if op == "delete" else task.to_dict(),
+    }
+    change_log.append(change)
+    broadcaster.publish("change", change, event_id(version))
+
+def _reset_changes():
+    """Bump the version for a change too broad to log; clients behind it have to resync"""
+    global version, _change_floor
+    version += 1
+    change_log.clear()
+    _change_floor = version
+    broadcaster.publish("resync", {"epoch": board_epoch, "version": version}, event_id(version))
+
+def event_id(event_version: int) -> str:
+    """The Server-Sent Events id for a version, which Last-Event-ID echoes back"""
+    return f"{board_epoch}-{event_version}"
+
+def get_changes(since: int) -> Optional[List[dict]]:
+    """
+    The changes made after version `since`, oldest first.
+    Returns None when they are no longer all in the change log.
+    """
+    with _lock:
+        if since > version or since < _change_floor:
+            return None
+        if not change_log:
+            return []
+        start = since - change_log[0]["version"] + 1
+        if start < 0:
+            return None
+        return list(islice(change_log, start, None))
+
+def _rebuild_index():
+    """Rebuild the id index and the search index from the columns"""
+    task_index.clear()
+    for column, tasks in databases.items():
+        for task in tasks:
+            task_index[task.id] = (column, task)
+    for column, tasks in databases.items():
+        search_indexes[column].rebuild(tasks)
+
+# Set once load_data() has filled the columns from storage
+loaded = threading.Event()
+
+# Seconds spent in each phase of the initial load: "parse" reads the stored
+# data into records, "build" sorts them into the columns and the id index
+load_timings: Dict[str, float] = {}
+
+# The background load started by start_loading()
+_loading: Optional[asyncio.Future] = None
+
+def load_data() -> Dict[str, float]:
+    """
+    Load the stored tasks into memory. This blocks, so run it off the event loop.
+    Returns the load timings.
+    """
+    started = time.perf_counter()
+    loaded_data = storage.load()
+    parsed = time.perf_counter()
+    replace_columns(loaded_data["signal"], loaded_data["noise"])
+    built = time.perf_counter()
+
+    load_timings.update({"parse": parsed - started, "build": built - parsed})
+    loaded.set()
+    return load_timings
+
+def start_loading() -> asyncio.Future:
+    """
+    Start load_data() on io_executor without waiting for it.
+    Returns a future for the load timings.
+    """
+    global _loading
+    _loading = asyncio.get_running_loop().run_in_executor(io_executor, load_data)
+    return _loading
+
+async def wait_until_loaded(timeout: float) -> bool:
+    """
+    Wait up to timeout seconds for the initial load to finish.
+    Returns True if the data is loaded, False otherwise.
+    """
+    if loaded.is_set():
+        return True
+    if _loading is None:
+        return False
+    try:
+        await asyncio.wait_for(asyncio.shield(_loading), timeout)
+    except Exception:
+        return False
+    return loaded.is_set()
+
+def get_task(task_id: str) -> Optional[Tuple[str, TaskRecord]]:
+    """Look up a task by id. Returns (column, task) or None"""
+    return task_index.get(task_id)
+
+def find_task(column: str, task_id: str) -> Optional[TaskRecord]:
+    """Look up a task by id within a specific column. Returns None if it isn't there"""
+    entry = task_index.get(task_id)
+    if entry is None or entry[0] != column:
+        return None
+    return entry[1]
+
+def _add(column: str, task: TaskRecord):
+    databases[column].add(task)
+    task_index[task.id] = (column, task)
+    search_indexes[column].add(task)
+
+def _remove(task_id: str) -> Optional[Tuple[str, TaskRecord]]:
+    entry = task_index.pop(task_id, None)
+    if entry is not None:
+        databases[entry[0]].remove(entry[1])
+        search_indexes[entry[0]].remove(task_id)
+    return entry
+
+def insert_task(column: str, task: TaskRecord):
+    """Add a task to a column at the position given by its order and index it"""
+    with _lock:
+        _add(column, task)
+        _record_change("insert", column, task)
+
+def remove_task(task_id: str) -> Optional[Tuple[str, TaskRecord]]:
+    """
+    Remove a task from its column.
+    Returns (column, task) for the removed task, or None if the id is unknown.
+    """
+    with _lock:
+        entry = _remove(task_id)
+        if entry is not None:
+            _record_change("delete", *entry)
+        return entry
+
+def append_tasks(tasks_by_column: Dict[str, List[TaskRecord]], resync: bool = True):
+    """
+    Add new tasks after the last task of their columns, keeping the given
+    order, in one step. Their orders are assigned here, ORDER_STEP apart.
+    Clients have to resync afterwards, as for any change to a whole column.
+    When the tasks are added over several calls, pass resync=False to all
+    but the last one, so that clients resync once.
+    """
+    with _lock:
+        for column, tasks in tasks_by_column.items():
+            order = next_order(column)
+            for task in tasks:
+                task.order = order
+                order += ORDER_STEP
+                task_index[task.id] = (column, task)
+            databases[column].extend(tasks)
+            search_indexes[column].extend(tasks)
+        if resync:
+            _reset_changes()
+
+def next_order(column: str) -> int:
+    """The order for a task appended to the end of a column"""
+    tasks = databases[column]
+    return tasks.max_order + ORDER_STEP if len(tasks) else 0
+
+def _order_at(column: str, position: int) -> Optional[int]:
+    """
+    Pick an order that places a task at a position in a column without touching
+    the tasks around it. Returns None when the neighbours leave no gap.
+    """
+    tasks = databases[column]
+    before = tasks.at(position - 1)
+    after = tasks.at(position)
+    if before is None and after is None:
+        return 0
+    if after is None:
+        return before.order + ORDER_STEP
+    if before is None:
+        return after.order - ORDER_STEP
+    if after.order - before.order < 2:
+        return None
+    return (before.order + after.order) // 2
+
+def _respace_column(column: str) -> List[TaskRecord]:
+    """Spread the orders of a column ORDER_STEP apart. Returns the tasks in order"""
+    tasks = list(databases[column])
+    for i, task in enumerate(tasks):
+        task.order = i * ORDER_STEP
+    databases[column].replace(tasks)
+    return tasks
+
+def reposition_task(task_id: str, new_column: str, position: int) -> Optional[Tuple[TaskRecord, bool]]:
+    """
+    Move a task to a zero-based position within the same or another column.
+    Only the moved task's order changes, unless its new neighbours have no gap
+    left between them, in which case the target column is respaced first.
+    Returns (task, respaced), or None if the id is unknown.
+    """
+    with _lock:
+        entry = _remove(task_id)
+        if entry is None:
+            return None
+        task = entry[1]
+        position = max(0, min(position, len(databases[new_column])))
+
+        respaced = False
+        new_order = _order_at(new_column, position)
+        if new_order is None:
+            _respace_column(new_column)
+            respaced = True
+            new_order = _order_at(new_column, position)
+
+        task.order = new_order
+        _add(new_column, task)
+        if respaced:
+            # Every order in the column changed, which the change log can't express
+            _reset_changes()
+        else:
+            _record_change("move", new_column, task)
+        return task, respaced
+
+def set_completed(column: str, task: TaskRecord, completed: bool):
+    """Change the completed flag of a task, keeping the column counters in sync"""
+    with _lock:
+        databases[column].set_completed(task, completed)
+        _record_change("update", column, task)
+
+def set_ignored(column: str, task: TaskRecord, ignored: bool):
+    """Change the ignored flag of a task, keeping the column counters in sync"""
+    with _lock:
+        databases[column].set_ignored(task, ignored)
+        _record_change("update", column, task)
+
+def set_text(column: str, task: TaskRecord, text: str):
+    """Change the text of a task"""
+    with _lock:
+        task.text = text
+        search_indexes[column].add(task)
+        _record_change("update", column, task)
+
+def get_stats() -> Dict[str, Dict[str, int]]:
+    """Per-column task counters, read from the columns without visiting any task"""
+    return {
+        column: {
+            "total": len(tasks),
+            "completed": tasks.completed_count,
+            "ignored": tasks.ignored_count,
+            "effective": tasks.effective_count,
+        }
+        for column, tasks in databases.items()
+    }
+
+def search_tasks(query: str, column: Optional[str] = None, limit: int = 50) -> Tuple[int, List[Tuple[str, TaskRecord]]]:
+    """
+    Find the tasks whose text has a word starting with each word of the query,
+    so unfinished words match as well (see SearchIndex.search).
+    Returns the number of matches and up to `limit` of them as (column, task),
+    in board order.
+    """
+    columns = [column] if column is not None else list(databases)
+    with _lock:
+        matches = {name: search_indexes[name].search(query) for name in columns}
+        total = sum(map(len, matches.values()))
+        scanned = sum(len(databases[name]) for name in columns)
+
+        if total * total > limit * scanned:
+            # Matches are dense enough that walking the columns in order finds
+            # `limit` of them sooner than sorting them all
+            walk = ((name, task) for name in columns for task in databases[name] if task.id in matches[name])
+            return total, list(islice(walk, limit))
+
+        positions = {name: i for i, name in enumerate(columns)}
+        entries = ((name, task_index[task_id][1]) for name in columns for task_id in matches[name])
+        return total, heapq.nsmallest(limit, entries, key=lambda entry: (positions[entry[0]], order_key(entry[1])))
+
+def read_in_chunks(column: str, size: int) -> Iterator[List[TaskRecord]]:
+    """
+    Read a column in order, `size` tasks at a time, each chunk under the store
+    lock. Tasks changed between two chunks are read as they are at the time.
+    """
+    key = None
+    while True:
+        with _lock:
+            chunk = list(islice(databases[column].after(key), size))
+        if not chunk:
+            return
+        yield chunk
+        key = order_key(chunk[-1])
+
+def transaction():
+    """
+    Hold the store lock across several mutations, so the persistence worker
+    never snapshots a state with only some of them applied.
+    Use as `with transaction():`.
+    """
+    return _lock
+
+def get_board() -> dict:
+    """Both columns in order, the counters and the version they correspond to"""
+    with _lock:
+        return {
+            "epoch": board_epoch,
+            "version": version,
+            "signal": list(databases["signal"]),
+            "noise": list(databases["noise"]),
+            "stats": get_stats(),
+        }
+
+def replace_columns(signal_tasks: List[TaskRecord], noise_tasks: List[TaskRecord]):
+    """Replace the contents of both columns and rebuild the index"""
+    with _lock:
+        databases["signal"].replace(signal_tasks)
+        databases["noise"].replace(noise_tasks)
+        _rebuild_index()
+        _reset_changes()
+
+def reorder_columns(signal_ids: List[str], noise_ids: List[str]) -> Optional[Tuple[set, set]]:
+    """
+    Put every task in the column that lists its id, in the listed order, with
+    orders ORDER_STEP apart. The two lists have to name every task.
+    Returns None, or (missing ids, extra ids) when the lists don't match the
+    tasks, in which case nothing changes.
+    """
+    with _lock:
+        provided_ids = set(signal_ids) | set(noise_ids)
+        if provided_ids != task_index.keys():
+            return task_index.keys() - provided_ids, provided_ids - task_index.keys()
+
+        columns = []
+        for task_ids in (signal_ids, noise_ids):
+            tasks = [task_index[task_id][1] for task_id in task_ids]
+            for i, task in enumerate(tasks):
+                task.order = i * ORDER_STEP
+            columns.append(tasks)
+        # Re-sorts the columns by the new orders and rebuilds the indexes
+        replace_columns(*columns)
+    return None
+
 def save_current_state():
-    """Save current in-memory state to file"""
-    print(f"Saving current state - Signal: {len(databases['signal'])} tasks, Noise: {len(databases['noise'])} tasks")
-    result = save_tasks_to_file(databases["signal"], databases["noise"])
+    """Save a full snapshot of the current in-memory state to storage"""
+    # Copy the columns so mutations on the event loop don't race with serialization
+    with _lock:
+        signal_tasks = list(databases["signal"])
+        noise_tasks = list(databases["noise"])
+    result = storage.save_snapshot(signal_tasks, noise_tasks)
     if result:
-        print("Successfully saved to file")
+        log_event(logger, logging.DEBUG, "snapshot_saved", signal=len(signal_tasks), noise=len(noise_tasks))
     else:
-        print("Failed to save to file")
+        log_event(logger, logging.ERROR, "snapshot_not_saved", signal=len(signal_tasks), noise=len(noise_tasks))
     return result
 
-def reload_from_file():
-    """Reload data from file into memory"""
+def _write_changes(records: List[dict], snapshot: bool) -> bool:
+    """Write queued records to storage, or a full snapshot when requested"""
+    if snapshot:
+        return save_current_state()
+    if not storage.write_changes(records):
+        return False
+    if storage.needs_snapshot():
+        return save_current_state()
+    return True
+
+persistence_worker = PersistenceWorker(_write_changes, FLUSH_DEBOUNCE_SECONDS, FLUSH_MAX_LATENCY_SECONDS)
+
+def task_change_record(column: str, task: TaskRecord) -> dict:
+    """The change record for an added or updated task"""
+    return {"op": "put", "column": column, "task": task.to_dict()}
+
+def task_deletion_record(task_id: str) -> dict:
+    """The change record for a deleted task"""
+    return {"op": "delete", "id": task_id}
+
+def save_task_change(column: str, task: TaskRecord) -> Future:
+    """
+    Queue a single added or updated task for persistence.
+    Returns a Future resolving to the success of the write that includes it.
+    """
+    return persistence_worker.submit([task_change_record(column, task)])
+
+def save_task_deletion(task_id: str) -> Future:
+    """Queue the deletion of a single task for persistence"""
+    return persistence_worker.submit([task_deletion_record(task_id)])
+
+def save_records(records: List[dict]) -> Future:
+    """Queue several records for persistence as one write"""
+    return persistence_worker.submit(records)
+
+def mark_dirty(*columns: str) -> Future:
+    """
+    Queue a full snapshot, for changes that touch every task of the given
+    columns (all of them when none are given). Shared storage never gets a
+    snapshot, which would drop the rows other processes committed since the
+    last pull: every task of the columns is queued as a put record instead.
+    """
+    if not storage.shared:
+        return persistence_worker.submit(snapshot=True)
+    with _lock:
+        records = [task_change_record(column, task) for column in columns or databases for task in databases[column]]
+    return persistence_worker.submit(records)
+
+async def commit(write: Future) -> bool:
+    """
+    Wait for a queued write, the Future returned when its change was queued,
+    to reach disk when durable writes are enabled. With shared storage it is
+    written straight away, so that other worker processes see it before the
+    response is sent.
+    """
+    if storage.shared:
+        # Skip the debounce window
+        persistence_worker.flush()
+        return await asyncio.wrap_future(write)
+    if not DURABLE_WRITES:
+        return True
+    return await asyncio.wrap_future(write)
+
+async def flush() -> bool:
+    """
+    Force a full snapshot now and wait for it to be written. Shared storage
+    already holds every change but the pending ones, so only those are written.
+    """
+    return await asyncio.wrap_future(persistence_worker.flush(snapshot=not storage.shared))
+
+def shutdown():
+    """Flush pending changes, stop the persistence worker and close storage"""
+    persistence_worker.stop()
+    storage.close()
+    export.cache.clear()
+
+async def reload_from_file():
+    """
+    Reload data from storage into memory. Storage is read on io_executor, but
+    the columns are replaced here on the event loop, since the routes read them
+    without taking the lock.
+    """
     global signal_tasks_db, noise_tasks_db, databases
-    loaded_data = load_tasks_from_file()
-    
-    # Clear and update the actual lists that databases points to
-    databases["signal"].clear()
-    databases["signal"].extend(loaded_data["signal"])
-    databases["noise"].clear()
-    databases["noise"].extend(loaded_data["noise"])
-    
-    print(f"Reloaded from file - Signal: {len(databases['signal'])} tasks, Noise: {len(databases['noise'])} tasks")
+    loaded_data = await run_io(storage.load)
+
+    # Update the actual lists that databases points to
+    replace_columns(loaded_data["signal"], loaded_data["noise"])
+
+    log_event(logger, logging.INFO, "reloaded", signal=len(databases["signal"]), noise=len(databases["noise"]))
+
+def apply_stored_changes(changes: List[Tuple[str, Optional[str], Optional[TaskRecord]]]):
+    """
+    Apply tasks changed in storage by another process: (task_id, column, task),
+    with column and task None for a deleted task. Nothing is persisted.
+    """
+    with _lock:
+        for task_id, column, task in changes:
+            entry = _remove(task_id)
+            if task is None or column not in databases:
+                if entry is not None:
+                    _record_change("delete", *entry)
+                continue
+            _add(column, task)
+            if entry is None:
+                _record_change("insert", column, task)
+            else:
+                _record_change("update" if entry[0] == column and entry[1].order == task.order else "move", column, task)
+
+async def sync_shared_state():
+    """
+    Bring the store up to date with the changes other worker processes have
+    committed to shared storage. Cheap when nothing changed elsewhere.
+    """
+    if not storage.shared or not storage.has_external_changes():
+        return
+    async with lock_columns():
+        # Write our own pending changes first, so the rows pulled below already include them
+        await asyncio.wrap_future(persistence_worker.flush())
+        changes = await run_io(storage.pull_changes)
+        if changes is None:
+            await reload_from_file()
+        else:
+            apply_stored_changes(changes)
+
+async def watch_shared_state(interval: float):
+    """
+    Keep pulling changes from other worker processes while clients are
+    subscribed to events, so changes made elsewhere are pushed to them too.
+    Runs until cancelled.
+    """
+    while True:
+        if len(broadcaster):
+            try:
+                await sync_shared_state()
+            except Exception as e:
+                log_event(logger, logging.ERROR, "shared_sync_failed", error=str(e))
+        await asyncio.sleep(interval)
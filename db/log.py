@@ -0,0 +1,145 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Lowest level written: DEBUG, INFO, WARNING or ERROR
+LOG_LEVEL = os.environ.get("TASKS_LOG_LEVEL", "INFO").upper()
+
+# "json" writes one JSON object per line, "text" one key=value line per record
+LOG_FORMAT = os.environ.get("TASKS_LOG_FORMAT", "json")
+
+# Records waiting to be written; records logged while the queue is full are dropped
+LOG_QUEUE_SIZE = int(os.environ.get("TASKS_LOG_QUEUE_SIZE", "10000"))
+
+# Share of a route's INFO and DEBUG records that are written, 0 to 1
+LOG_SAMPLE_RATE = float(os.environ.get("TASKS_LOG_SAMPLE_RATE", "1"))
+
+# Per-route overrides of LOG_SAMPLE_RATE, e.g.
+# "PUT /tasks/bulk-update=0.1,DELETE /tasks/column/{column}/{task_id}=0.01"
+LOG_SAMPLE_ROUTES = os.environ.get("TASKS_LOG_SAMPLE_ROUTES", "")
+
+
+def _parse_sample_routes(value: str) -> Dict[str, float]:
+    """The "route=rate" pairs of a comma-separated list"""
+    rates = {}
+    for item in value.split(","):
+        route, _, rate = item.rpartition("=")
+        if route.strip():
+            rates[route.strip()] = float(rate)
+    return rates
+
+
+# route -> share of its records that are written
+sample_rates = _parse_sample_routes(LOG_SAMPLE_ROUTES)
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats a record as its time, level, logger and event (the message) plus
+    the fields passed to log_event(), either as JSON or as key=value pairs.
+    """
+
+    def __init__(self, format: str = LOG_FORMAT):
+        super().__init__()
+        self.format_name = format
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        dropped = getattr(record, "dropped", 0)
+        if dropped:
+            entry["dropped"] = dropped
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if self.format_name == "text":
+            return " ".join(f"{key}={value}" for key, value in entry.items())
+        # default=str, so a field that isn't plain JSON still gets written
+        return json.dumps(entry, default=str, ensure_ascii=False, separators=(",", ":"))
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without ever blocking the caller.
+    Records that arrive while the queue is full are dropped, and the next
+    record that gets through says how many were.
+    """
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread. Only a traceback is
+        # rendered here, while its frames are still current.
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.dropped:
+            record.dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        else:
+            self.dropped = 0
+
+
+# Every logger of the app is a child of this one
+logger = logging.getLogger("tasks")
+logger.setLevel(LOG_LEVEL)
+logger.propagate = False
+
+_output = logging.StreamHandler(sys.stderr)
+_output.setFormatter(StructuredFormatter())
+logger.addHandler(DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE)))
+
+# Writes the queued records to stderr on its own thread
+listener = QueueListener(logger.handlers[0].queue, _output)
+listener.start()
+# Write whatever is still queued when the process exits
+atexit.register(listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """The logger for one part of the app, e.g. get_logger("api")"""
+    return logger.getChild(name)
+
+
+def _sampled(route: str) -> bool:
+    rate = sample_rates.get(route, LOG_SAMPLE_RATE)
+    return rate >= 1 or random.random() < rate
+
+
+def log_event(
+    target: logging.Logger, level: int, event: str, route: Optional[str] = None, debug: Optional[dict] = None, **fields
+):
+    """
+    Log an event with structured fields. Below WARNING, records logged for a
+    route are sampled at the route's rate. `debug` holds payload-sized fields,
+    such as lists of task IDs, and is only included when the logger is at DEBUG.
+    Nothing is formatted here; that happens on the listener thread.
+    """
+    if not target.isEnabledFor(level):
+        return
+    if route is not None:
+        if level < logging.WARNING and not _sampled(route):
+            return
+        fields["route"] = route
+    if debug and target.isEnabledFor(logging.DEBUG):
+        fields.update(debug)
+    target.log(level, event, extra={"fields": fields})
@@ -0,0 +1,267 @@
+from bisect import bisect_left
+from itertools import filterfalse
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+from db.task_record import TaskRecord
+
+# Target number of tasks per block. Blocks are split at twice this size and
+# merged into a neighbour once they shrink below a quarter of it.
+BLOCK_SIZE = 512
+
+# Filter matches are sorted directly when they make up less than 1/SORT_FILTERED_RATIO
+# of the column, and picked out while walking the column otherwise
+SORT_FILTERED_RATIO = 16
+
+# Tasks are kept sorted by (order, id); the id breaks ties between equal orders
+OrderKey = Tuple[int, str]
+
+
+def order_key(task: TaskRecord) -> OrderKey:
+    """The sort key of a task within its column"""
+    return (task.order, task.id)
+
+
+class OrderedColumn:
+    """
+    The tasks of one column, always kept in `order` sequence.
+    Tasks live in a list of small sorted blocks, with the last key of every block
+    held in a separate list. Locating a task is a binary search over the block
+    maxima followed by one within a block, and inserting or removing shifts at
+    most one block, so neither depends on the size of the column.
+    Iteration yields tasks in order without sorting.
+    The column also keeps the sets of its completed and ignored tasks as they
+    come and go, which give the counters and answer status filters.
+    The `order` of a task must not change while it is in a column; remove it,
+    update the order and add it back instead. Status flags are changed through
+    set_completed() and set_ignored() so the sets stay accurate.
+    """
+
+    def __init__(self, tasks: Iterable[TaskRecord] = ()):
+        self._keys: List[List[OrderKey]] = []
+        self._tasks: List[List[TaskRecord]] = []
+        self._maxes: List[OrderKey] = []
+        self._len = 0
+        self._completed: Set[TaskRecord] = set()
+        self._ignored: Set[TaskRecord] = set()
+        self.replace(tasks)
+
+    def replace(self, tasks: Iterable[TaskRecord]):
+        """Replace the contents of the column"""
+        ordered = sorted(tasks, key=order_key)
+        self._tasks = [ordered[i:i + BLOCK_SIZE] for i in range(0, len(ordered), BLOCK_SIZE)]
+        self._keys = [[order_key(task) for task in block] for block in self._tasks]
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._len = len(ordered)
+        self._completed = {task for task in ordered if task.completed}
+        self._ignored = {task for task in ordered if task.ignored}
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[TaskRecord]:
+        for block in self._tasks:
+            yield from block
+
+    @property
+    def completed_count(self) -> int:
+        return len(self._completed)
+
+    @property
+    def ignored_count(self) -> int:
+        return len(self._ignored)
+
+    @property
+    def effective_count(self) -> int:
+        """The number of tasks that count towards the signal/noise ratio"""
+        return self._len - self.ignored_count
+
+    def set_completed(self, task: TaskRecord, completed: bool):
+        """Change the completed flag of a task in this column"""
+        task.completed = completed
+        self._update_status(self._completed, task, completed)
+
+    def set_ignored(self, task: TaskRecord, ignored: bool):
+        """Change the ignored flag of a task in this column"""
+        task.ignored = ignored
+        self._update_status(self._ignored, task, ignored)
+
+    @staticmethod
+    def _update_status(tasks: Set[TaskRecord], task: TaskRecord, flagged: bool):
+        if flagged:
+            tasks.add(task)
+        else:
+            tasks.discard(task)
+
+    @property
+    def max_order(self) -> int:
+        """The highest order in the column, or -1 when it is empty"""
+        return self._maxes[-1][0] if self._maxes else -1
+
+    def add(self, task: TaskRecord):
+        """Insert a task at the position given by its order"""
+        key = order_key(task)
+        self._update_status(self._completed, task, task.completed)
+        self._update_status(self._ignored, task, task.ignored)
+        if not self._maxes:
+            self._keys.append([key])
+            self._tasks.append([task])
+            self._maxes.append(key)
+            self._len = 1
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            # Past the current maximum: append to the last block
+            i -= 1
+            self._keys[i].append(key)
+            self._tasks[i].append(task)
+            self._maxes[i] = key
+        else:
+            j = bisect_left(self._keys[i], key)
+            self._keys[i].insert(j, key)
+            self._tasks[i].insert(j, task)
+        self._len += 1
+
+        if len(self._keys[i]) > 2 * BLOCK_SIZE:
+            self._split(i)
+
+    def extend(self, tasks: List[TaskRecord]):
+        """
+        Append tasks that are already in order and sort after every task in the
+        column, filling whole blocks instead of inserting them one by one.
+        Raises ValueError if the first task doesn't sort after the last one.
+        """
+        if not tasks:
+            return
+        keys = [order_key(task) for task in tasks]
+        if self._maxes and keys[0] <= self._maxes[-1]:
+            raise ValueError("Tasks passed to extend() must sort after the column's last task")
+
+        start = 0
+        if self._keys and len(self._keys[-1]) < BLOCK_SIZE:
+            # Top up the last block first
+            start = BLOCK_SIZE - len(self._keys[-1])
+            self._keys[-1].extend(keys[:start])
+            self._tasks[-1].extend(tasks[:start])
+            self._maxes[-1] = self._keys[-1][-1]
+        for i in range(start, len(tasks), BLOCK_SIZE):
+            self._keys.append(keys[i:i + BLOCK_SIZE])
+            self._tasks.append(tasks[i:i + BLOCK_SIZE])
+            self._maxes.append(self._keys[-1][-1])
+        self._len += len(tasks)
+        self._completed.update(task for task in tasks if task.completed)
+        self._ignored.update(task for task in tasks if task.ignored)
+
+    def remove(self, task: TaskRecord) -> bool:
+        """
+        Remove a task from the column.
+        Returns True if it was found, False otherwise.
+        """
+        key = order_key(task)
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        keys = self._keys[i]
+        j = bisect_left(keys, key)
+        if keys[j] != key:
+            return False
+
+        del keys[j]
+        del self._tasks[i][j]
+        self._len -= 1
+        self._completed.discard(task)
+        self._ignored.discard(task)
+
+        if not keys:
+            del self._keys[i]
+            del self._tasks[i]
+            del self._maxes[i]
+        else:
+            self._maxes[i] = keys[-1]
+            if len(keys) < BLOCK_SIZE // 4 and len(self._keys) > 1:
+                self._merge(i)
+        return True
+
+    def at(self, position: int) -> Optional[TaskRecord]:
+        """The task at a zero-based position, or None when out of range"""
+        if position < 0 or position >= self._len:
+            return None
+        for block in self._tasks:
+            if position < len(block):
+                return block[position]
+            position -= len(block)
+        return None
+
+    def after(self, key: Optional[OrderKey]) -> Iterator[TaskRecord]:
+        """Iterate over the tasks that sort strictly after key (all tasks when key is None)"""
+        if key is None:
+            yield from self
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return
+        keys = self._keys[i]
+        j = bisect_left(keys, key)
+        if j < len(keys) and keys[j] == key:
+            j += 1
+        yield from self._tasks[i][j:]
+        for block in self._tasks[i + 1:]:
+            yield from block
+
+    def filtered(self, completed: Optional[bool] = None, ignored: Optional[bool] = None, key: Optional[OrderKey] = None) -> Iterator[TaskRecord]:
+        """
+        Iterate in order over the tasks with the given status that sort strictly
+        after key. A status left as None isn't filtered on.
+        The status sets are combined first: when tasks are required to be
+        flagged, intersecting the sets gives the matches, which are sorted
+        directly if they are few. Otherwise the column is walked in order,
+        testing each task against the sets, which stops as soon as the caller
+        has read enough.
+        """
+        included: Optional[Set[TaskRecord]] = None
+        excluded: List[Set[TaskRecord]] = []
+        for tasks, wanted in ((self._completed, completed), (self._ignored, ignored)):
+            if wanted is None:
+                continue
+            if not wanted:
+                excluded.append(tasks)
+            elif included is None:
+                included = tasks
+            else:
+                included = included & tasks
+
+        if included is not None:
+            for tasks in excluded:
+                included = included - tasks
+            excluded = []
+
+        if included is None or len(included) * SORT_FILTERED_RATIO > self._len:
+            result = self.after(key)
+            if included is not None:
+                result = filter(included.__contains__, result)
+            for tasks in excluded:
+                result = filterfalse(tasks.__contains__, result)
+            return result
+
+        ordered = sorted(included, key=order_key)
+        if key is None:
+            return iter(ordered)
+        start = bisect_left(ordered, key, key=order_key)
+        if start < len(ordered) and order_key(ordered[start]) == key:
+            start += 1
+        return iter(ordered[start:])
+
+    def _split(self, i: int):
+        keys, tasks = self._keys[i], self._tasks[i]
+        self._keys[i:i + 1] = [keys[:BLOCK_SIZE], keys[BLOCK_SIZE:]]
+        self._tasks[i:i + 1] = [tasks[:BLOCK_SIZE], tasks[BLOCK_SIZE:]]
+        self._maxes[i:i + 1] = [keys[BLOCK_SIZE - 1], keys[-1]]
+
+    def _merge(self, i: int):
+        # Fold block i into its left neighbour (or the right one for the first block)
+        if i == 0:
+            i = 1
+        self._keys[i - 1].extend(self._keys.pop(i))
+        self._tasks[i - 1].extend(self._tasks.pop(i))
+        self._maxes.pop(i - 1)
+        if len(self._keys[i - 1]) > 2 * BLOCK_SIZE:
+            self._split(i - 1)
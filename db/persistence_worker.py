@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional
+from db.log import get_logger, log_event
+
+logger = get_logger("persistence")
+
+# Wait before retrying a failed write, doubled after every further failure up to the maximum
+RETRY_MIN_SECONDS = 0.1
+RETRY_MAX_SECONDS = 5.0
+
+
+class PersistenceWorker:
+    """
+    Background thread that persists mutations off the event loop.
+    Mutations mark the store dirty; the worker waits until no new mutation has
+    arrived for `debounce` seconds (but never longer than `max_latency` seconds
+    after the first one) and then writes everything collected in one go.
+    A failed write is retried with backoff until it succeeds; flush() retries
+    it straight away, and stop() makes one last attempt.
+    """
+
+    def __init__(self, write_changes: Callable[[List[dict], bool], bool], debounce: float, max_latency: float):
+        # write_changes(records, snapshot) performs the actual write and returns success
+        self._write_changes = write_changes
+        self._debounce = debounce
+        self._max_latency = max_latency
+        self._cond = threading.Condition()
+        self._pending: List[dict] = []
+        self._snapshot_requested = False
+        self._dirty = False
+        self._force = False
+        self._first_dirty_at = 0.0
+        self._last_dirty_at = 0.0
+        self._future: Future = Future()
+        # Future of the batch the thread is writing right now, if any
+        self._writing: Optional[Future] = None
+        # Backoff after a failed write: no retry before _retry_at unless forced
+        self._retry_delay = 0.0
+        self._retry_at = 0.0
+        self._thread = None
+        self._stopping = False
+
+    def start(self):
+        """Start the worker thread if it is not running yet"""
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="persistence-worker", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Flush anything still pending and stop the worker thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+
+    def submit(self, records: List[dict] = None, snapshot: bool = False) -> Future:
+        """
+        Queue records for the next write, or request a full snapshot.
+        Returns a Future resolving to the success of the write that includes them.
+        """
+        self.start()
+        with self._cond:
+            if records:
+                self._pending.extend(records)
+            if snapshot:
+                self._snapshot_requested = True
+            now = time.monotonic()
+            if not self._dirty:
+                self._dirty = True
+                self._first_dirty_at = now
+            self._last_dirty_at = now
+            self._cond.notify()
+            return self._future
+
+    def flush(self, snapshot: bool = False) -> Future:
+        """
+        Write pending changes now instead of waiting for the debounce window.
+        Returns a Future resolving to the success of that write.
+        """
+        self.start()
+        with self._cond:
+            if snapshot:
+                self._snapshot_requested = True
+            elif not self._dirty:
+                return self.pending()
+            if not self._dirty:
+                self._dirty = True
+                self._first_dirty_at = self._last_dirty_at = time.monotonic()
+            self._force = True
+            self._cond.notify()
+            return self._future
+
+    def pending(self) -> Future:
+        """
+        Returns a Future for the write covering everything submitted so far:
+        the next write while changes are waiting, otherwise the one in progress.
+        Writes happen one at a time, so the next one resolves after the current one.
+        """
+        with self._cond:
+            if self._dirty:
+                return self._future
+            if self._writing is not None:
+                return self._writing
+        done: Future = Future()
+        done.set_result(True)
+        return done
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._dirty and not self._stopping:
+                    self._cond.wait()
+                if not self._dirty:
+                    return
+
+                # Collapse a burst of mutations into a single write
+                while not self._force and not self._stopping:
+                    deadline = min(self._last_dirty_at + self._debounce, self._first_dirty_at + self._max_latency)
+                    deadline = max(deadline, self._retry_at)
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                records, self._pending = self._pending, []
+                snapshot, self._snapshot_requested = self._snapshot_requested, False
+                future, self._future = self._future, Future()
+                self._writing = future
+                self._dirty = False
+                self._force = False
+
+            try:
+                success = self._write_changes(records, snapshot)
+            except Exception as e:
+                log_event(logger, logging.ERROR, "persist_failed", error=str(e))
+                success = False
+
+            with self._cond:
+                self._writing = None
+                if success:
+                    self._retry_delay = 0.0
+                    self._retry_at = 0.0
+                elif self._stopping:
+                    # The last attempt before shutdown failed too
+                    log_event(logger, logging.ERROR, "persist_abandoned", records=len(records), snapshot=snapshot)
+                else:
+                    # Keep the records, and stay dirty so the write is retried after a backoff
+                    self._pending[:0] = records
+                    self._snapshot_requested = self._snapshot_requested or snapshot
+                    now = time.monotonic()
+                    if not self._dirty:
+                        self._dirty = True
+                        self._first_dirty_at = self._last_dirty_at = now
+                    self._retry_delay = min(max(self._retry_delay * 2, RETRY_MIN_SECONDS), RETRY_MAX_SECONDS)
+                    self._retry_at = now + self._retry_delay
+            future.set_result(success)
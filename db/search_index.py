@@ -0,0 +1,141 @@
+import re
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Set, Tuple
+from db.task_record import TaskRecord
+
+_TOKEN = re.compile(r"\w+")
+
+# Sorts after any character a token can contain, so prefix + _MAX_CHAR bounds
+# the tokens starting with prefix
+_MAX_CHAR = "\U0010ffff"
+
+# Rough cost of checking one candidate's tokens against a prefix, relative to
+# looking an id up in a set
+_FILTER_COST = 50
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return _TOKEN.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Inverted index over task text: every token maps to the ids of the tasks
+    containing it. The vocabulary is also kept sorted, so the tokens starting
+    with a prefix form one contiguous range found by binary search.
+    A query matches the tasks that contain, for every query token, some token
+    starting with it.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = {}
+        self._vocabulary: List[str] = []
+        # The distinct tokens of every indexed task, for removal and filtering
+        self._task_tokens: Dict[str, Tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._task_tokens)
+
+    def rebuild(self, tasks: Iterable[TaskRecord]):
+        """Index the given tasks from scratch"""
+        self._postings = {}
+        self._task_tokens = {}
+        postings = self._postings
+        for task in tasks:
+            tokens = tuple(set(tokenize(task.text)))
+            self._task_tokens[task.id] = tokens
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is None:
+                    postings[token] = {task.id}
+                else:
+                    ids.add(task.id)
+        self._vocabulary = sorted(postings)
+
+    def add(self, task: TaskRecord):
+        """Index a task, replacing what was indexed for its id before"""
+        self.remove(task.id)
+        tokens = tuple(set(tokenize(task.text)))
+        self._task_tokens[task.id] = tokens
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                self._postings[token] = {task.id}
+                insort(self._vocabulary, token)
+            else:
+                ids.add(task.id)
+
+    def extend(self, tasks: Iterable[TaskRecord]):
+        """
+        Index many tasks that aren't indexed yet, sorting the vocabulary once
+        at the end instead of inserting every new token into it.
+        """
+        postings = self._postings
+        new_tokens = []
+        for task in tasks:
+            tokens = tuple(set(tokenize(task.text)))
+            self._task_tokens[task.id] = tokens
+            for token in tokens:
+                ids = postings.get(token)
+                if ids is None:
+                    postings[token] = {task.id}
+                    new_tokens.append(token)
+                else:
+                    ids.add(task.id)
+        if new_tokens:
+            self._vocabulary = sorted(self._vocabulary + new_tokens)
+
+    def remove(self, task_id: str):
+        """Drop a task from the index"""
+        tokens = self._task_tokens.pop(task_id, None)
+        if tokens is None:
+            return
+        for token in tokens:
+            ids = self._postings[token]
+            ids.discard(task_id)
+            if not ids:
+                del self._postings[token]
+                del self._vocabulary[bisect_left(self._vocabulary, token)]
+
+    def _prefix_tokens(self, prefix: str) -> List[str]:
+        """The indexed tokens that start with prefix"""
+        vocabulary = self._vocabulary
+        start = bisect_left(vocabulary, prefix)
+        end = bisect_left(vocabulary, prefix + _MAX_CHAR, start)
+        return vocabulary[start:end]
+
+    def search(self, query: str) -> Set[str]:
+        """
+        The ids of the tasks matching every token of the query, each as a prefix.
+        Returns an empty set for a query without tokens.
+        """
+        postings = self._postings
+        terms = []
+        for term in set(tokenize(query)):
+            tokens = self._prefix_tokens(term)
+            if not tokens:
+                return set()
+            terms.append((sum(len(postings[token]) for token in tokens), term, tokens))
+        if not terms:
+            return set()
+
+        # Start from the term matching the fewest tasks and narrow down from there
+        terms.sort()
+        _, _, tokens = terms[0]
+        matches: Set[str] = set().union(*(postings[token] for token in tokens))
+        for _, term, tokens in terms[1:]:
+            if not matches:
+                break
+            intersect_cost = sum(min(len(matches), len(postings[token])) for token in tokens)
+            if len(matches) * _FILTER_COST < intersect_cost:
+                # Many tokens share this prefix: checking the candidates' own tokens is cheaper
+                task_tokens = self._task_tokens
+                matches = {
+                    task_id for task_id in matches
+                    if any(token.startswith(term) for token in task_tokens[task_id])
+                }
+            else:
+                # Set intersection iterates the smaller side
+                matches = set().union(*(matches & postings[token] for token in tokens))
+        return matches
@@ -0,0 +1,72 @@
+import json
+from json.encoder import encode_basestring
+from typing import Iterable, Optional
+
+from db.task_record import COMPLETED, IGNORED, TaskRecord
+
+# orjson is a project dependency; the fallback below covers an environment without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_BOOLEANS = ("false", "true")
+
+_TASK_TEMPLATE = '{"id":%s,"text":%s,"completed":%s,"ignored":%s,"order":%d}'
+
+
+def dumps(value) -> bytes:
+    """Encode a plain JSON value compactly"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(data):
+    """Decode a JSON value from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def encode_task(record: TaskRecord) -> str:
+    """Encode one record as a JSON object with the same fields as Task"""
+    flags = record.flags
+    return _TASK_TEMPLATE % (
+        encode_basestring(record.id),
+        encode_basestring(record.text),
+        _BOOLEANS[bool(flags & COMPLETED)],
+        _BOOLEANS[bool(flags & IGNORED)],
+        record.order,
+    )
+
+
+def encode_tasks(records: Iterable[TaskRecord]) -> bytes:
+    """
+    Encode records as a JSON array straight from the store, without building a
+    Task model or dict per task on the standard-library path.
+    """
+    if orjson is not None:
+        return orjson.dumps([record.to_dict() for record in records])
+    return ("[" + ",".join(map(encode_task, records)) + "]").encode()
+
+
+def encode_columns(signal: Iterable[TaskRecord], noise: Iterable[TaskRecord]) -> bytes:
+    """Encode both columns as {"signal": [...], "noise": [...]}"""
+    return b'{"signal":' + encode_tasks(signal) + b',"noise":' + encode_tasks(noise) + b"}"
+
+
+def encode_page(records: Iterable[TaskRecord], next_cursor: Optional[str]) -> bytes:
+    """Encode a column page as {"tasks": [...], "next_cursor": ...}"""
+    return b'{"tasks":' + encode_tasks(records) + b',"next_cursor":' + dumps(next_cursor) + b"}"
+
+
+def encode_board(board: dict) -> bytes:
+    """Encode the result of in_memory_db.get_board()"""
+    return (
+        b'{"epoch":' + dumps(board["epoch"])
+        + b',"version":' + dumps(board["version"])
+        + b',"signal":' + encode_tasks(board["signal"])
+        + b',"noise":' + encode_tasks(board["noise"])
+        + b',"stats":' + dumps(board["stats"]) + b"}"
+    )
@@ -0,0 +1,259 @@
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, List, Optional
+from db.log import get_logger, log_event
+from db.storage import StorageEngine, StoredChange
+from db.task_record import TaskRecord
+
+# Path to the SQLite database used by the "sqlite" storage engine
+SQLITE_FILE = "tasks_data.db"
+
+# Number of entries kept in the change log that shared processes pull from.
+# A process that falls further behind reloads the whole board instead.
+CHANGE_LOG_LIMIT = 10000
+
+logger = get_logger("sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    board_column TEXT NOT NULL,
+    sort_order INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    flags INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tasks_column_order ON tasks (board_column, sort_order);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT,
+    origin TEXT NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO tasks (id, board_column, sort_order, text, flags) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    board_column = excluded.board_column,
+    sort_order = excluded.sort_order,
+    text = excluded.text,
+    flags = excluded.flags
+"""
+
+_SELECT_TASKS = "SELECT id, board_column, sort_order, text, flags FROM tasks"
+
+
+def _task_row(column: str, task: TaskRecord) -> tuple:
+    return (task.id, column, task.order, task.text, task.flags)
+
+
+def _record_row(column: str, task_data: dict) -> tuple:
+    return _task_row(column, TaskRecord.from_dict(task_data))
+
+
+def _row_task(row: tuple) -> TaskRecord:
+    task_id, _, order, text, flags = row
+    task = TaskRecord(task_id, text, order)
+    task.flags = flags
+    return task
+
+
+class SqliteEngine(StorageEngine):
+    """
+    Tasks stored one row each in an SQLite database in WAL journal mode.
+    A put or delete record touches a single row, so persisting a mutation never
+    rewrites the other tasks. Rows are looked up by their primary key (the task
+    id), and (board_column, sort_order) is indexed for reading a column in order.
+
+    A shared engine also logs the id of every changed task in the `changes`
+    table, tagged with the process that wrote it, so that other processes using
+    the same database can pull just those tasks. A NULL task id marks a change
+    to the whole board (a clear). A shared engine's snapshot only upserts the
+    given tasks: deleting the other rows would drop tasks another process added
+    that this one hasn't pulled yet.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_FILE, shared: bool = False):
+        self.path = path
+        self.shared = shared
+        # Identifies the change log entries written by this process
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        # Last change log entry this process has seen
+        self._synced_seq = 0
+        # The connection is shared by the request handlers and the persistence worker
+        self._lock = threading.Lock()
+        self._connection = None
+        # A second connection that only polls data_version, with its own lock, so
+        # the check made before every request never waits behind a write
+        # transaction on the main connection. Commits on the main connection move
+        # its data_version too, so our own writes cost one (empty) pull later.
+        self._watch_lock = threading.Lock()
+        self._watch_connection = None
+        # data_version of the watch connection when the changes were last pulled
+        self._watch_version = None
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """The open connection, (re)opened on first use after close(). Call with the lock held."""
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # Wait for the write lock instead of failing when another process holds it
+            self._connection.execute("PRAGMA busy_timeout=5000")
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _data_version(self) -> int:
+        """data_version as seen by the watch connection, which it (re)opens if needed"""
+        with self._watch_lock:
+            if self._watch_connection is None:
+                self._watch_connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            return self._watch_connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _log_changes(self, connection: sqlite3.Connection, task_ids: List[Optional[str]]):
+        """Add change log entries and drop the oldest ones beyond CHANGE_LOG_LIMIT"""
+        if not self.shared:
+            return
+        connection.executemany(
+            "INSERT INTO changes (task_id, origin) VALUES (?, ?)",
+            [(task_id, self.origin) for task_id in task_ids],
+        )
+        connection.execute(
+            "DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?", (CHANGE_LOG_LIMIT,)
+        )
+
+    def load(self) -> Dict[str, List[TaskRecord]]:
+        tasks = {"signal": [], "noise": []}
+        try:
+            with self._lock:
+                connection = self._connect()
+                # Taken before reading, so a commit landing in between is pulled later
+                self._watch_version = self._data_version()
+                # Read the tasks and the change log position as one consistent view
+                connection.execute("BEGIN")
+                try:
+                    rows = connection.execute(_SELECT_TASKS + " ORDER BY board_column, sort_order").fetchall()
+                    self._synced_seq = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+                finally:
+                    connection.execute("COMMIT")
+            for row in rows:
+                tasks.setdefault(row[1], []).append(_row_task(row))
+        except sqlite3.Error as e:
+            log_event(logger, logging.ERROR, "load_failed", engine="sqlite", error=str(e))
+        return tasks
+
+    def write_changes(self, records: List[dict]) -> bool:
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute("BEGIN")
+                try:
+                    changed_ids = []
+                    for record in records:
+                        op = record.get("op")
+                        if op == "put":
+                            connection.execute(_UPSERT, _record_row(record["column"], record["task"]))
+                            changed_ids.append(record["task"]["id"])
+                        elif op == "delete":
+                            connection.execute("DELETE FROM tasks WHERE id = ?", (record["id"],))
+                            changed_ids.append(record["id"])
+                        elif op == "clear":
+                            connection.execute("DELETE FROM tasks")
+                            changed_ids.append(None)
+                    self._log_changes(connection, changed_ids)
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            return True
+        except Exception as e:
+            log_event(logger, logging.ERROR, "write_failed", engine="sqlite", error=str(e))
+            return False
+
+    def save_snapshot(self, signal_tasks: List[TaskRecord], noise_tasks: List[TaskRecord]) -> bool:
+        try:
+            with self._lock:
+                connection = self._connect()
+                connection.execute("BEGIN")
+                try:
+                    rows = [_task_row("signal", task) for task in signal_tasks] + [_task_row("noise", task) for task in noise_tasks]
+                    if self.shared:
+                        connection.executemany(_UPSERT, rows)
+                        self._log_changes(connection, [row[0] for row in rows])
+                    else:
+                        connection.execute("DELETE FROM tasks")
+                        connection.executemany(
+                            "INSERT INTO tasks (id, board_column, sort_order, text, flags) VALUES (?, ?, ?, ?, ?)", rows
+                        )
+                    connection.execute("COMMIT")
+                except Exception:
+                    connection.execute("ROLLBACK")
+                    raise
+            return True
+        except Exception as e:
+            log_event(logger, logging.ERROR, "snapshot_failed", engine="sqlite", error=str(e))
+            return False
+
+    def clear(self) -> bool:
+        return self.write_changes([{"op": "clear"}])
+
+    def has_external_changes(self) -> bool:
+        if not self.shared:
+            return False
+        # data_version only changes when another connection commits, so this
+        # check costs one pragma when nothing happened elsewhere
+        return self._data_version() != self._watch_version
+
+    def pull_changes(self) -> Optional[List[StoredChange]]:
+        if not self.shared:
+            return []
+        with self._lock:
+            connection = self._connect()
+            # Taken before reading, so a commit landing in between is pulled later
+            data_version = self._data_version()
+            connection.execute("BEGIN")
+            try:
+                oldest = connection.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+                entries = connection.execute(
+                    "SELECT seq, task_id FROM changes WHERE seq > ? AND origin != ? ORDER BY seq",
+                    (self._synced_seq, self.origin),
+                ).fetchall()
+                latest = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+                # Entries we haven't seen were dropped from the log, or another
+                # process replaced the whole board: only a full reload will do
+                if (oldest is not None and oldest > self._synced_seq + 1) or any(task_id is None for _, task_id in entries):
+                    return None
+
+                task_ids = list(dict.fromkeys(task_id for _, task_id in entries))
+                rows = {}
+                for task_id in task_ids:
+                    row = connection.execute(_SELECT_TASKS + " WHERE id = ?", (task_id,)).fetchone()
+                    if row is not None:
+                        rows[task_id] = row
+            finally:
+                connection.execute("COMMIT")
+            self._synced_seq = latest
+            self._watch_version = data_version
+
+        changes = []
+        for task_id in task_ids:
+            row = rows.get(task_id)
+            changes.append((task_id, row[1], _row_task(row)) if row else (task_id, None, None))
+        return changes
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+        with self._watch_lock:
+            if self._watch_connection is not None:
+                self._watch_connection.close()
+                self._watch_connection = None
@@ -0,0 +1,119 @@
+import os
+from typing import Dict, List, Optional, Tuple
+from db import file_persistence
+from db.task_record import TaskRecord
+
+# Storage engine used for persistence: "json" (the task data file plus its
+# write-ahead log) or "sqlite" (see db/sqlite_storage.py)
+STORAGE_ENGINE = os.environ.get("TASKS_STORAGE_ENGINE", "json")
+
+# When enabled, several worker processes share one board through the storage
+# engine, each pulling the changes the others commit. Needs the sqlite engine.
+SHARED_STATE = os.environ.get("TASKS_SHARED_STATE", "0") == "1"
+
+# A change pulled from another process: (task_id, column, task), where column
+# and task are None when the task was deleted
+StoredChange = Tuple[str, Optional[str], Optional[TaskRecord]]
+
+
+class StorageEngine:
+    """
+    Interface between the in-memory store and whatever keeps the tasks on disk.
+    Changes arrive as the records built by in_memory_db: {"op": "put", "column",
+    "task"}, {"op": "delete", "id"} and {"op": "clear"}.
+    """
+
+    name = ""
+
+    # Whether other processes write to the same storage (see pull_changes)
+    shared = False
+
+    def load(self) -> Dict[str, List[TaskRecord]]:
+        """
+        Load every stored task.
+        Returns dictionary with signal and noise task lists.
+        """
+        raise NotImplementedError
+
+    def write_changes(self, records: List[dict]) -> bool:
+        """
+        Persist a batch of change records.
+        Returns True if successful, False otherwise.
+        """
+        raise NotImplementedError
+
+    def needs_snapshot(self) -> bool:
+        """Whether the engine wants a full snapshot after the last write"""
+        return False
+
+    def save_snapshot(self, signal_tasks: List[TaskRecord], noise_tasks: List[TaskRecord]) -> bool:
+        """
+        Replace everything stored with the given tasks.
+        Returns True if successful, False otherwise.
+        """
+        raise NotImplementedError
+
+    def clear(self) -> bool:
+        """
+        Remove every stored task.
+        Returns True if successful, False otherwise.
+        """
+        raise NotImplementedError
+
+    def has_external_changes(self) -> bool:
+        """Whether another process may have committed changes since the last load or pull"""
+        return False
+
+    def pull_changes(self) -> Optional[List[StoredChange]]:
+        """
+        Collect the tasks changed by other processes since the last load or pull.
+        Returns None when those changes can't be listed one by one and the
+        caller has to load everything again.
+        """
+        return []
+
+    def close(self):
+        """Release any handles held by the engine"""
+
+
+class JsonFileEngine(StorageEngine):
+    """
+    The task data file with its write-ahead log, as implemented in
+    db/file_persistence.py. In "snapshot" persistence mode every write becomes
+    a full snapshot.
+    """
+
+    name = "json"
+
+    def load(self) -> Dict[str, List[TaskRecord]]:
+        return file_persistence.load_tasks_from_file()
+
+    def write_changes(self, records: List[dict]) -> bool:
+        if file_persistence.PERSISTENCE_MODE != "wal":
+            return True
+        return file_persistence.append_to_wal(records)
+
+    def needs_snapshot(self) -> bool:
+        return file_persistence.PERSISTENCE_MODE != "wal" or file_persistence.wal_needs_compaction()
+
+    def save_snapshot(self, signal_tasks: List[TaskRecord], noise_tasks: List[TaskRecord]) -> bool:
+        return file_persistence.compact_wal(signal_tasks, noise_tasks)
+
+    def clear(self) -> bool:
+        return file_persistence.clear_file_data()
+
+
+def create_storage_engine(name: str = STORAGE_ENGINE, shared: bool = SHARED_STATE) -> StorageEngine:
+    """
+    Build the storage engine with the given name, shared between processes if requested.
+    Raises ValueError for an unknown name, or a shared engine that isn't sqlite.
+    """
+    if name == "json":
+        if shared:
+            raise ValueError("Shared state needs the sqlite storage engine (TASKS_STORAGE_ENGINE=sqlite)")
+        return JsonFileEngine()
+    if name == "sqlite":
+        # Imported here so the default engine doesn't load sqlite3
+        from db.sqlite_storage import SqliteEngine
+        return SqliteEngine(shared=shared)
+    raise ValueError(f"Unknown storage engine: {name}")
@@ -0,0 +1,67 @@
+from models.task import Task
+
+# Bits of TaskRecord.flags
+COMPLETED = 0x01
+IGNORED = 0x02
+
+
+class TaskRecord:
+    """
+    Compact in-memory representation of a task, used by the store instead of
+    the pydantic Task model.
+    A record has no __dict__ and no validation state: just four slots, with
+    the completed and ignored booleans packed into one small-int flags field.
+    Task models are only built at the API boundary, via to_model() or to_dict().
+    """
+
+    __slots__ = ("id", "text", "order", "flags")
+
+    def __init__(self, id: str, text: str, order: int = 0, completed: bool = False, ignored: bool = False):
+        self.id = id
+        self.text = text
+        self.order = order
+        self.flags = (COMPLETED if completed else 0) | (IGNORED if ignored else 0)
+
+    @property
+    def completed(self) -> bool:
+        return bool(self.flags & COMPLETED)
+
+    @completed.setter
+    def completed(self, value: bool):
+        self.flags = self.flags | COMPLETED if value else self.flags & ~COMPLETED
+
+    @property
+    def ignored(self) -> bool:
+        return bool(self.flags & IGNORED)
+
+    @ignored.setter
+    def ignored(self, value: bool):
+        self.flags = self.flags | IGNORED if value else self.flags & ~IGNORED
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TaskRecord":
+        """Build a record from a task dict as stored on disk"""
+        return cls(
+            str(data["id"]),
+            str(data["text"]),
+            int(data.get("order", 0)),
+            bool(data.get("completed", False)),
+            bool(data.get("ignored", False)),
+        )
+
+    def to_dict(self) -> dict:
+        """The task as a plain dict, with the same keys as Task"""
+        return {
+            "id": self.id,
+            "text": self.text,
+            "completed": bool(self.flags & COMPLETED),
+            "ignored": bool(self.flags & IGNORED),
+            "order": self.order,
+        }
+
+    def to_model(self) -> Task:
+        """The task as a Task model"""
+        return Task(**self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"TaskRecord(id={self.id!r}, text={self.text!r}, order={self.order}, flags={self.flags})"
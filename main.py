@@ -1,45 +1,132 @@
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+import time
+
+# Measured from here to the end of the imports below for the startup report
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, status
+from fastapi.responses import HTMLResponse, JSONResponse
+import asyncio
+import logging
 import uvicorn
 import os
 
 # Import the API router from api.tasks
 from api.tasks import router as tasks_router
+from api.static_assets import REVALIDATE_CACHE_CONTROL, AssetCache, CachedStaticFiles, asset_response
+import db.in_memory_db
+from db.log import get_logger, log_event
 
-app = FastAPI()
+# Seconds spent importing the application modules
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
-# Create a 'static' directory if it doesn't exist
+# How often a worker with shared state checks for other workers' changes while clients are subscribed to events
+SHARED_WATCH_SECONDS = 0.05
+
+# Directory for the HTML, CSS and JS served at /static, created on startup
 static_dir = "static"
-if not os.path.exists(static_dir):
-    os.makedirs(static_dir)
 
-# Create a custom StaticFiles class with no-cache headers
-from fastapi.staticfiles import StaticFiles
-from fastapi import Request
-from fastapi.responses import FileResponse
-import time
+# The files of static_dir held in memory, filled on startup
+asset_cache = AssetCache(static_dir)
+
+logger = get_logger("app")
+
+
+async def _load_and_report():
+    """Loads the stored tasks in a worker thread and logs the startup report"""
+    try:
+        timings = await db.in_memory_db.start_loading()
+    except Exception as e:
+        log_event(logger, logging.ERROR, "startup_load_failed", error=str(e))
+        return
+    task_count = len(db.in_memory_db.task_index)
+    log_event(
+        logger, logging.INFO, "startup",
+        import_seconds=round(IMPORT_SECONDS, 3), parse_seconds=round(timings["parse"], 3),
+        build_seconds=round(timings["build"], 3), tasks=task_count,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Creates the static files and reads them into the asset cache, starts the
+    persistence worker and loads the tasks in the background, so the server
+    accepts connections (and answers /healthz) while the data file is still
+    being read. Pending changes are flushed on shutdown.
+    """
+    os.makedirs(static_dir, exist_ok=True)
+    _ensure_static_files()
+    asset_cache.preload()
+    db.in_memory_db.persistence_worker.start()
+    loading = asyncio.create_task(_load_and_report())
+    # With shared state, pull other workers' changes for the event streams
+    watcher = None
+    if db.in_memory_db.storage.shared:
+        watcher = asyncio.create_task(db.in_memory_db.watch_shared_state(SHARED_WATCH_SECONDS))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    await loading
+    await asyncio.to_thread(db.in_memory_db.shutdown)
+
+
+app = FastAPI(lifespan=lifespan)
 
-class NoCacheStaticFiles(StaticFiles):
-    def file_response(self, *args, **kwargs) -> FileResponse:
-        response = super().file_response(*args, **kwargs)
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache" 
-        response.headers["Expires"] = "0"
-        return response
+from fastapi import Request
 
-# Mount static files with no-cache headers
-app.mount("/static", NoCacheStaticFiles(directory=static_dir), name="static")
+# Mount static files, served from memory. The page links to them under
+# content-hash fingerprinted names, which are cached as immutable; a changed
+# file gets a new URL.
+app.mount("/static", CachedStaticFiles(asset_cache), name="static")
 
 # Include the tasks router
 # All routes defined in tasks_router will be prefixed with "/tasks".
 app.include_router(tasks_router, prefix="/tasks", tags=["tasks"])
-print("FastAPI: tasks_router included with prefix '/tasks'") # Added for debugging confirmation
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness check: the server is up, whether or not the tasks are loaded.
+    """
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness check: 200 once the tasks are loaded, 503 before that.
+    Returns the startup timings in seconds when ready.
+    """
+    if not db.in_memory_db.loaded.is_set():
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "loading"})
+    return {
+        "status": "ready",
+        "tasks": len(db.in_memory_db.task_index),
+        "startup": {"import": IMPORT_SECONDS, **db.in_memory_db.load_timings},
+    }
+
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def read_root(request: Request):
+    """
+    Serves the main HTML page from the asset cache, with its asset URLs
+    fingerprinted and compressed as the request accepts.
+    The page carries an ETag and a Last-Modified date; a request whose
+    If-None-Match or If-Modified-Since still matches gets 304 Not Modified.
+    """
+    page = asset_cache.get_page("index.html")
+    if page is None:
+        # index.html was removed while the server was running
+        _ensure_static_files()
+        page = asset_cache.get_page("index.html")
+    return asset_response(page, request.headers, REVALIDATE_CACHE_CONTROL)
+
+
+def _ensure_static_files():
     """
-    Serves the main HTML page.
+    Writes index.html, style.css and script.js to the static directory when
+    index.html is missing.
     """
     # Construct the full path to index.html
     index_html_path = os.path.join(static_dir, "index.html")
@@ -50,7 +137,7 @@ async def read_root():
         # This block creates the static files if they don't exist.
         # It's primarily for convenience when running the app for the first time.
         # In a production environment, you would ensure these files are pre-built.
-        print(f"Creating {index_html_path}...")
+        log_event(logger, logging.INFO, "static_file_created", file=index_html_path)
         with open(index_html_path, "w") as f:
             f.write("""
 <!DOCTYPE html>
@@ -101,13 +188,13 @@ async def read_root():
         </div>
     </div>
 
-    <script src="/static/script.js?v={int(time.time())}"></script>
+    <script src="/static/script.js"></script>
 </body>
 </html>
                     """)
         # Create style.css if it doesn't exist
         style_css_path = os.path.join(static_dir, "style.css")
-        print(f"Creating {style_css_path}...")
+        log_event(logger, logging.INFO, "static_file_created", file=style_css_path)
         with open(style_css_path, "w") as f:
             f.write("""
 /* Claude.ai inspired design system */
@@ -477,42 +564,165 @@ ul {
                     """)
         # Create script.js if it doesn't exist
         script_js_path = os.path.join(static_dir, "script.js")
-        print(f"Creating {script_js_path}...")
+        log_event(logger, logging.INFO, "static_file_created", file=script_js_path)
         with open(script_js_path, "w") as f:
             f.write("""
 const API_URL = window.location.origin; // Dynamically gets the base URL of your application
 
 // Event listener to fetch and render tasks when the DOM is fully loaded
 document.addEventListener('DOMContentLoaded', () => {
-    fetchAndRenderTasks('signal'); // Load tasks for the 'Signal' column
-    fetchAndRenderTasks('noise');  // Load tasks for the 'Noise' column
-    updateProgressBar();           // Initialize the progress bar
+    fetchAndRenderBoard(); // Load both columns in a single request
+    updateProgressBar();   // Initialize the progress bar
+    subscribeToEvents();   // Receive changes made in other tabs or by other users
 });
 
+// Local copy of the board: the epoch and version it was synced at, and every task by id
+const boardState = { epoch: null, version: null, tasks: new Map() };
+
+// Epoch and version of the last event received on the event stream. With several
+// worker processes the stream and a board request may be served by different
+// workers, whose versions don't compare; the stream's then win.
+const streamState = { epoch: null, version: null };
+
 /**
- * Fetches tasks for a given column from the API and renders them in the UI.
- * @param {string} column - The column name ('signal' or 'noise').
+ * Fetches both columns from the API in one request and renders them in the UI.
  */
-async function fetchAndRenderTasks(column) {
+async function fetchAndRenderBoard() {
     try {
-        const response = await fetch(`${API_URL}/tasks/${column}`);
+        const response = await fetch(`${API_URL}/tasks/board`);
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const data = await response.json();
-        const list = document.getElementById(`${column}-list`);
-        list.innerHTML = ''; // Clear existing tasks to prevent duplicates on re-render
-
-        // Append each task to the appropriate list in the DOM
-        data.tasks.forEach(task => {
-            list.appendChild(createTaskElement(task, column));
+        const board = await response.json();
+        if (streamState.epoch !== null && board.epoch !== streamState.epoch) {
+            // Served by another worker: follow the stream's versions from here
+            boardState.epoch = streamState.epoch;
+            boardState.version = streamState.version;
+        } else {
+            boardState.epoch = board.epoch;
+            boardState.version = board.version;
+        }
+        boardState.tasks.clear();
+        ['signal', 'noise'].forEach(column => {
+            const list = document.getElementById(`${column}-list`);
+            list.innerHTML = ''; // Clear existing tasks to prevent duplicates on re-render
+            board[column].forEach(task => {
+                boardState.tasks.set(task.id, { task, column });
+                list.appendChild(createTaskElement(task, column));
+            });
         });
     } catch (error) {
-        console.error(`Error fetching tasks for ${column}:`, error);
-        // Optionally, display an error message to the user
+        console.error('Error fetching board:', error);
     }
 }
 
+/**
+ * Brings the board up to date by applying only the changes made since the last sync.
+ * Falls back to fetching the whole board when the server asks for a resync.
+ */
+async function syncBoard() {
+    if (boardState.version === null) {
+        return fetchAndRenderBoard();
+    }
+    try {
+        const response = await fetch(`${API_URL}/tasks/changes?since=${boardState.version}&epoch=${boardState.epoch}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const feed = await response.json();
+        if (feed.resync) {
+            return fetchAndRenderBoard();
+        }
+        // Skip changes the event stream has already applied
+        feed.changes.filter(change => change.version > boardState.version).forEach(applyChange);
+        boardState.version = Math.max(boardState.version, feed.version);
+    } catch (error) {
+        console.error('Error syncing board:', error);
+    }
+}
+
+/**
+ * Subscribes to the server's event stream, so changes made in other tabs or by
+ * other users appear within milliseconds and without polling.
+ */
+function subscribeToEvents() {
+    const events = new EventSource(`${API_URL}/tasks/events`);
+
+    // Sent on every (re)connection; catch up if anything happened while disconnected
+    events.addEventListener('hello', event => {
+        const hello = JSON.parse(event.data);
+        streamState.epoch = hello.epoch;
+        streamState.version = hello.version;
+        if (boardState.version === null) {
+            return; // The board request still in flight will line up with the stream
+        }
+        if (hello.epoch !== boardState.epoch) {
+            fetchAndRenderBoard(); // Another worker, or the server restarted
+        } else if (hello.version !== boardState.version) {
+            syncBoard();
+        }
+    });
+
+    events.addEventListener('change', event => {
+        const change = JSON.parse(event.data);
+        streamState.version = change.version;
+        if (boardState.version === null || change.version <= boardState.version) {
+            return; // Not loaded yet, or already applied
+        }
+        if (change.version !== boardState.version + 1) {
+            syncBoard(); // A change was missed; fetch everything since the last one applied
+            return;
+        }
+        applyChange(change);
+        boardState.version = change.version;
+        scheduleProgressUpdate();
+    });
+
+    // The whole board changed, or this client fell too far behind
+    events.addEventListener('resync', event => {
+        const resync = JSON.parse(event.data);
+        streamState.epoch = resync.epoch;
+        streamState.version = resync.version;
+        fetchAndRenderBoard();
+        scheduleProgressUpdate();
+    });
+}
+
+let progressUpdateTimer = null;
+
+/**
+ * Updates the progress bar once a burst of pushed changes has settled.
+ */
+function scheduleProgressUpdate() {
+    clearTimeout(progressUpdateTimer);
+    progressUpdateTimer = setTimeout(updateProgressBar, 100);
+}
+
+/**
+ * Applies one entry of the change feed to the rendered board.
+ * @param {object} change - The change with op, id, column and task properties.
+ */
+function applyChange(change) {
+    const existing = document.querySelector(`li.task-item[data-id="${CSS.escape(change.id)}"]`);
+    if (existing) {
+        existing.remove();
+    }
+    boardState.tasks.delete(change.id);
+    if (change.op === 'delete') {
+        return;
+    }
+
+    // Insert before the first task that sorts after this one
+    boardState.tasks.set(change.id, { task: change.task, column: change.column });
+    const list = document.getElementById(`${change.column}-list`);
+    const next = Array.from(list.children).find(li => {
+        const entry = boardState.tasks.get(li.dataset.id);
+        return entry && (entry.task.order > change.task.order ||
+            (entry.task.order === change.task.order && li.dataset.id > change.id));
+    });
+    list.insertBefore(createTaskElement(change.task, change.column), next || null);
+}
+
 /**
  * Creates an individual task list item (<li>) element.
  * @param {object} task - The task object with id, text, and completed properties.
@@ -575,7 +785,7 @@ async function addTask(column) {
     if (text) { // Only proceed if the input is not empty
         try {
             // Send a POST request with a JSON body
-            const response = await fetch(`${API_URL}/tasks/${column}`, {
+            const response = await fetch(`${API_URL}/tasks/column/${column}`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ text: text }) // Send text as JSON
@@ -586,7 +796,8 @@ async function addTask(column) {
             }
 
             input.value = ''; // Clear the input field after successful addition
-            await fetchAndRenderTasks(column); // Re-fetch and render to update the list
+            const task = await response.json();
+            applyChange({ op: 'insert', id: task.id, column, task }); // Other changes arrive on the event stream
             updateProgressBar(); // Update the progress bar as task counts have changed
         } catch (error) {
             console.error(`Error adding task to ${column}:`, error);
@@ -602,7 +813,7 @@ async function addTask(column) {
  */
 async function deleteTask(taskId, column) {
     try {
-        const response = await fetch(`${API_URL}/tasks/${column}/${taskId}`, {
+        const response = await fetch(`${API_URL}/tasks/column/${column}/${taskId}`, {
             method: 'DELETE'
         });
 
@@ -610,7 +821,7 @@ async function deleteTask(taskId, column) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        await fetchAndRenderTasks(column); // Re-fetch and render to update the list
+        applyChange({ op: 'delete', id: taskId }); // Other changes arrive on the event stream
         updateProgressBar(); // Update the progress bar as task counts have changed
     } catch (error) {
         console.error(`Error deleting task from ${column}:`, error);
@@ -629,7 +840,7 @@ async function editTask(taskId, column, textSpan) {
 
     if (newText !== null && newText.trim() !== "") { // If user entered new text and didn't cancel
         try {
-            const response = await fetch(`${API_URL}/tasks/${column}/${taskId}`, {
+            const response = await fetch(`${API_URL}/tasks/column/${column}/${taskId}`, {
                 method: 'PUT',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({ text: newText.trim() }) // Send new text as JSON
@@ -657,7 +868,7 @@ async function editTask(taskId, column, textSpan) {
  */
 async function toggleTaskCompleted(taskId, column, isCompleted) {
     try {
-        const response = await fetch(`${API_URL}/tasks/${column}/${taskId}/complete`, {
+        const response = await fetch(`${API_URL}/tasks/column/${column}/${taskId}/complete`, {
             method: 'PUT',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ completed: isCompleted }) // Send completion status as JSON
@@ -667,8 +878,9 @@ async function toggleTaskCompleted(taskId, column, isCompleted) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-        // Re-fetch to apply strikethrough/un-strikethrough and keep UI consistent
-        await fetchAndRenderTasks(column);
+        // Apply strikethrough/un-strikethrough from the updated task the server returned
+        const task = await response.json();
+        applyChange({ op: 'update', id: task.id, column, task });
         updateProgressBar(); // Update progress bar (though completion doesn't change counts, it's good practice)
     } catch (error) {
         console.error(`Error toggling task completion in ${column}:`, error);
@@ -676,31 +888,50 @@ async function toggleTaskCompleted(taskId, column, isCompleted) {
     }
 }
 
+/**
+ * Downloads the board as a Markdown checklist.
+ * The server streams the export from GET /tasks/export, so the page doesn't
+ * need to hold the task lists to build it.
+ */
+function downloadMarkdown() {
+    const link = document.createElement('a');
+    link.href = `${API_URL}/tasks/export?format=markdown`;
+    link.download = 'tasks.md';
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+}
+
 /**
  * Updates the progress bar based on the ratio of signal to noise tasks.
+ * Ignored tasks don't count towards the ratio. The counts come from the
+ * server-maintained /tasks/stats endpoint, so no task lists are downloaded.
  */
 async function updateProgressBar() {
     try {
-        // Get current data from localStorage or fetch from API
-        const localData = loadFromLocalStorage();
-        if (localData && localData.signal && localData.noise) {
-            updateProgressBarFromData(localData);
-        } else {
-            // Fallback: fetch current data from API
-            const signalResponse = await fetch(`${API_URL}/tasks/column/signal`);
-            const noiseResponse = await fetch(`${API_URL}/tasks/column/noise`);
-            
-            if (signalResponse.ok && noiseResponse.ok) {
-                const signalData = await signalResponse.json();
-                const noiseData = await noiseResponse.json();
-                const data = {
-                    signal: signalData.tasks,
-                    noise: noiseData.tasks
-                };
-                updateProgressBarFromData(data);
-            } else {
-                throw new Error('Failed to fetch task data');
-            }
+        const response = await fetch(`${API_URL}/tasks/stats`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        const stats = await response.json();
+
+        const signalCount = stats.signal.effective;
+        const noiseCount = stats.noise.effective;
+        const total = signalCount + noiseCount;
+        const signalPercent = total > 0 ? Math.round((signalCount / total) * 100) : 0;
+        const noisePercent = total > 0 ? 100 - signalPercent : 0;
+
+        const progressBar = document.getElementById('progress-bar');
+        const progressLabel = document.getElementById('progress-label');
+        progressBar.style.width = `${signalPercent}%`;
+        progressLabel.textContent = `Signal: ${signalPercent}% | Noise: ${noisePercent}%`;
+
+        // Red when noise exceeds 20%, green when signal reaches 80%
+        progressBar.className = 'progress-bar-fill';
+        if (noisePercent > 20) {
+            progressBar.classList.add('red');
+        } else if (signalPercent >= 80) {
+            progressBar.classList.add('green');
         }
     } catch (error) {
         console.error('Error updating progress bar:', error);
@@ -715,9 +946,5 @@ async function updateProgressBar() {
 
                     """)
 
-    # Open index.html and return its content
-    with open(index_html_path, "r") as f:
-        return HTMLResponse(content=f.read())
-
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8000)
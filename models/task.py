@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 # Represents a single task item
 class Task(BaseModel):
@@ -29,7 +29,7 @@ class TaskIgnore(BaseModel):
 class TaskMove(BaseModel):
     task_id: str
     new_column: str
-    new_order: int
+    new_order: int # Zero-based position in the target column
 
 # Model for updating the complete state of both columns
 class TasksState(BaseModel):
@@ -39,3 +39,90 @@ class TasksState(BaseModel):
 # Model for a list of tasks, used when fetching all tasks for a column
 class TaskList(BaseModel):
     tasks: List[Task]
+
+# Model for one page of a column, with the cursor to pass back for the next page
+class TaskPage(TaskList):
+    next_cursor: Optional[str] = None # None when there are no more tasks
+
+# Model for the size of a column, without its tasks
+class ColumnSummary(BaseModel):
+    column: str
+    count: int
+
+# Model for the counters of a single column
+class ColumnStats(BaseModel):
+    total: int
+    completed: int
+    ignored: int
+    effective: int # Tasks that count towards the ratio (total minus ignored)
+
+# Model for the counters of both columns
+class BoardStats(BaseModel):
+    signal: ColumnStats
+    noise: ColumnStats
+
+# Model for the whole board in one response
+class Board(BaseModel):
+    epoch: str # Identifies the server run; versions from different epochs aren't comparable
+    version: int # Increases with every mutation
+    signal: List[Task]
+    noise: List[Task]
+    stats: BoardStats
+
+# Model for one entry of the change feed
+class TaskChange(BaseModel):
+    version: int # The board version this change produced
+    op: Literal["insert", "update", "move", "delete"]
+    id: str
+    column: str # The task's column after the change (before it, for deletes)
+    task: Optional[Task] = None # The task after the change; None for deletes
+
+# Model for the response of the change feed
+class TaskChanges(BaseModel):
+    epoch: str
+    version: int # The current board version, to pass as `since` next time
+    resync: bool # True when the changes since the requested version are no longer available
+    changes: List[TaskChange]
+
+# Model for one task found by a search, with the column it is in
+class SearchHit(BaseModel):
+    column: str
+    task: Task
+
+# Model for the response of a search
+class SearchResults(BaseModel):
+    query: str
+    total: int # Number of matching tasks, which may exceed the hits returned
+    hits: List[SearchHit] # The first matches in board order, at most `limit` of them
+
+# Model for the outcome of an import
+class ImportResult(BaseModel):
+    imported: Dict[str, int] # Number of tasks added to each column
+    version: int # The board version after the import
+
+# Model for a single operation within a batch
+class BatchOperation(BaseModel):
+    op: Literal["create", "edit", "complete", "ignore", "delete", "move"]
+    column: Optional[str] = None # Target column for create; optional check for the others
+    task_id: Optional[str] = None # Required for everything but create
+    text: Optional[str] = None # For create and edit
+    completed: Optional[bool] = None # For complete
+    ignored: Optional[bool] = None # For ignore
+    new_column: Optional[str] = None # For move
+    new_order: Optional[int] = None # For move: zero-based position in the target column
+
+# Model for a batch of operations applied together
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+# Model for the outcome of a single batch operation
+class BatchResult(BaseModel):
+    index: int
+    op: str
+    task_id: str
+    task: Optional[Task] = None # None for delete
+
+# Model for the outcome of a whole batch
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
+    version: int # Board version after the batch
\ No newline at end of file
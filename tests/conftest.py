@@ -0,0 +1,11 @@
+import pytest
+
+from db import file_persistence
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run the test in an empty directory, where the data files are created"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(file_persistence, "_wal_record_count", 0)
+    return tmp_path
@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from db import file_persistence
+from db.task_record import TaskRecord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def put(column, task):
+    return {"op": "put", "column": column, "task": task.to_dict()}
+
+
+def columns(data):
+    return {column: [(task.id, task.text, task.order, task.completed, task.ignored) for task in tasks] for column, tasks in data.items()}
+
+
+@pytest.mark.parametrize("snapshot_format", ["json", "binary"])
+def test_snapshot_round_trip_keeps_non_ascii_text(data_dir, monkeypatch, snapshot_format):
+    monkeypatch.setattr(file_persistence, "SNAPSHOT_FORMAT", snapshot_format)
+    signal = [TaskRecord("1", "Café ☕", 0, completed=True), TaskRecord("2", "naïve \"quoted\"\nline", 1024)]
+    noise = [TaskRecord("3", "日本語", 0, ignored=True)]
+    assert file_persistence.save_tasks_to_file(signal, noise)
+    loaded = file_persistence.load_tasks_from_file()
+    assert columns(loaded) == columns({"signal": signal, "noise": noise})
+
+
+def test_non_ascii_board_loads_under_an_ascii_locale(data_dir):
+    file_persistence.save_tasks_to_file([TaskRecord("1", "Café", 0)], [])
+    file_persistence.append_to_wal([put("noise", TaskRecord("2", "thé", 0))])
+    # LC_ALL=C with UTF-8 mode off makes the locale encoding ASCII
+    env = dict(os.environ, LC_ALL="C", PYTHONUTF8="0", PYTHONPATH=ROOT)
+    script = (
+        "from db import file_persistence\n"
+        "data = file_persistence.load_tasks_from_file()\n"
+        "print(ascii([task.text for column in ('signal', 'noise') for task in data[column]]))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=data_dir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ascii(["Café", "thé"])
+
+
+def test_wal_replays_puts_moves_and_deletes(data_dir):
+    file_persistence.save_tasks_to_file([TaskRecord("1", "one", 0)], [TaskRecord("2", "two", 0)])
+    assert file_persistence.append_to_wal([
+        put("signal", TaskRecord("3", "three", 1024)),
+        put("noise", TaskRecord("1", "one, moved", 1024)),
+        {"op": "delete", "id": "2"},
+    ])
+    loaded = file_persistence.load_tasks_from_file()
+    assert columns(loaded) == {
+        "signal": [("3", "three", 1024, False, False)],
+        "noise": [("1", "one, moved", 1024, False, False)],
+    }
+    assert file_persistence._wal_record_count == 3
+
+
+def test_wal_clear_drops_earlier_tasks(data_dir):
+    file_persistence.save_tasks_to_file([TaskRecord("1", "one", 0)], [])
+    file_persistence.append_to_wal([{"op": "clear"}, put("noise", TaskRecord("2", "two", 0))])
+    assert columns(file_persistence.load_tasks_from_file()) == {"signal": [], "noise": [("2", "two", 0, False, False)]}
+
+
+def test_truncated_wal_line_is_skipped(data_dir):
+    file_persistence.append_to_wal([put("signal", TaskRecord("1", "one", 0))])
+    # An append interrupted halfway through its line
+    with open(file_persistence.WAL_FILE, "ab") as f:
+        f.write(b'{"op":"put","column":"signal","task":{"id":"2"')
+    assert columns(file_persistence.load_tasks_from_file()) == {"signal": [("1", "one", 0, False, False)], "noise": []}
+
+
+def test_compaction_keeps_tasks_and_empties_wal(data_dir, monkeypatch):
+    monkeypatch.setattr(file_persistence, "WAL_COMPACT_THRESHOLD", 2)
+    file_persistence.append_to_wal([put("signal", TaskRecord("1", "one", 0)), put("noise", TaskRecord("2", "two", 0))])
+    assert file_persistence.wal_needs_compaction()
+    data = file_persistence.load_tasks_from_file()
+    assert file_persistence.compact_wal(data["signal"], data["noise"])
+    assert not file_persistence.wal_needs_compaction()
+    assert os.path.getsize(file_persistence.WAL_FILE) == 0
+    assert columns(file_persistence.load_tasks_from_file()) == columns(data)
+
+
+def test_crash_before_wal_truncation_loads_the_same_tasks(data_dir):
+    file_persistence.append_to_wal([put("signal", TaskRecord("1", "one", 0)), {"op": "delete", "id": "1"}, put("noise", TaskRecord("2", "two", 0))])
+    data = file_persistence.load_tasks_from_file()
+    # The snapshot reached disk, the log was never truncated
+    file_persistence.save_tasks_to_file(data["signal"], data["noise"])
+    assert columns(file_persistence.load_tasks_from_file()) == columns(data)
+
+
+def test_failed_snapshot_keeps_the_previous_one(data_dir, monkeypatch):
+    file_persistence.save_tasks_to_file([TaskRecord("1", "one", 0)], [])
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(file_persistence.os, "replace", fail)
+        assert not file_persistence.compact_wal([], [])
+    assert columns(file_persistence.load_tasks_from_file()) == {"signal": [("1", "one", 0, False, False)], "noise": []}
+
+
+def test_failed_wal_append_reports_failure(data_dir, monkeypatch):
+    monkeypatch.setattr(file_persistence, "WAL_FILE", str(data_dir / "missing" / "tasks_data.wal"))
+    assert not file_persistence.append_to_wal([put("signal", TaskRecord("1", "one", 0))])
+    assert file_persistence._wal_record_count == 0
+
+
+def test_clear_removes_every_file(data_dir):
+    file_persistence.save_tasks_to_file([TaskRecord("1", "one", 0)], [])
+    file_persistence.append_to_wal([put("signal", TaskRecord("2", "two", 0))])
+    assert file_persistence.clear_file_data()
+    assert sorted(os.listdir(data_dir)) == []
+    assert columns(file_persistence.load_tasks_from_file()) == {"signal": [], "noise": []}
@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import pytest
+
+from db import file_persistence, in_memory_db
+from db.task_record import TaskRecord
+
+
+@pytest.fixture
+def store(data_dir):
+    """The store, empty, persisting to the data files of the test directory"""
+    in_memory_db.replace_columns([], [])
+    yield in_memory_db
+    in_memory_db.replace_columns([], [])
+
+
+def test_reload_replaces_the_columns_on_the_event_loop(store, monkeypatch):
+    file_persistence.save_tasks_to_file([TaskRecord("1", "one", 0)], [TaskRecord("2", "two", 0)])
+    threads = []
+    replace_columns = store.replace_columns
+
+    def record_thread(*args):
+        threads.append(threading.current_thread())
+        replace_columns(*args)
+
+    monkeypatch.setattr(store, "replace_columns", record_thread)
+    asyncio.run(store.reload_from_file())
+    assert threads == [threading.main_thread()]
+    assert [task.id for task in store.databases["signal"]] == ["1"]
+    assert [task.id for task in store.databases["noise"]] == ["2"]
+    assert store.task_index.keys() == {"1", "2"}
+
+
+def test_import_in_chunks_keeps_file_order_and_resyncs_once(store, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from api import tasks
+
+    monkeypatch.setattr(tasks, "IMPORT_APPLY_SIZE", 10)
+    lines = "".join(f'{{"text":"task {i}","column":"{"noise" if i % 3 else "signal"}"}}\n' for i in range(25))
+    with TestClient(main.app) as client:
+        version = client.get("/tasks/board").json()["version"]
+        response = client.post("/tasks/import", files={"file": ("tasks.ndjson", lines)})
+        assert response.status_code == 201
+        assert response.json() == {"imported": {"signal": 9, "noise": 16}, "version": version + 1}
+        board = client.get("/tasks/board").json()
+    assert [task["text"] for task in board["signal"]] == [f"task {i}" for i in range(25) if i % 3 == 0]
+    assert [task["text"] for task in board["noise"]] == [f"task {i}" for i in range(25) if i % 3]
+    assert [task["order"] for task in board["noise"]] == [i * store.ORDER_STEP for i in range(16)]
+
+
+def test_reorder_columns_moves_and_respaces_every_task(store):
+    store.replace_columns([TaskRecord("1", "one", 0), TaskRecord("2", "two", 5)], [TaskRecord("3", "three", 0)])
+    assert store.reorder_columns(["3", "1"], ["2"]) is None
+    assert [(task.id, task.order) for task in store.databases["signal"]] == [("3", 0), ("1", store.ORDER_STEP)]
+    assert [(task.id, task.order) for task in store.databases["noise"]] == [("2", 0)]
+    assert store.get_task("2")[0] == "noise"
+
+
+def test_reorder_columns_with_mismatched_ids_changes_nothing(store):
+    store.replace_columns([TaskRecord("1", "one", 0), TaskRecord("2", "two", 5)], [])
+    assert store.reorder_columns(["2", "4"], []) == ({"1"}, {"4"})
+    assert [(task.id, task.order) for task in store.databases["signal"]] == [("1", 0), ("2", 5)]
@@ -0,0 +1,94 @@
+import threading
+import time
+
+from db import persistence_worker
+from db.persistence_worker import PersistenceWorker
+
+
+class FlakyWriter:
+    """write_changes() stand-in that fails the first `failures` calls"""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = []
+        self.written = []
+
+    def __call__(self, records, snapshot):
+        self.calls.append((list(records), snapshot))
+        time.sleep(self.delay)
+        if len(self.calls) <= self.failures:
+            return False
+        self.written.extend(records)
+        return True
+
+
+def make_worker(writer) -> PersistenceWorker:
+    return PersistenceWorker(writer, debounce=0.01, max_latency=0.05)
+
+
+def test_submitted_records_are_written_in_one_batch():
+    writer = FlakyWriter()
+    worker = make_worker(writer)
+    futures = [worker.submit([{"n": i}]) for i in range(5)]
+    assert all(future.result(timeout=5) for future in futures)
+    assert writer.written == [{"n": i} for i in range(5)]
+    assert len(writer.calls) == 1
+    worker.stop()
+
+
+def test_pending_and_flush_wait_for_the_write_in_progress():
+    writer = FlakyWriter(delay=0.3)
+    worker = make_worker(writer)
+    submitted = worker.submit([{"n": 1}])
+    time.sleep(0.1)
+    assert not worker.pending().done()
+    assert not worker.flush().done()
+    assert submitted.result(timeout=5)
+    worker.stop()
+
+
+def test_failed_write_is_retried(monkeypatch):
+    monkeypatch.setattr(persistence_worker, "RETRY_MIN_SECONDS", 0.01)
+    writer = FlakyWriter(failures=2)
+    worker = make_worker(writer)
+    assert worker.submit([{"n": 1}]).result(timeout=5) is False
+    # The retries need no further submission
+    deadline = time.monotonic() + 5
+    while not writer.written and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert writer.written == [{"n": 1}]
+    assert len(writer.calls) == 3
+    worker.stop()
+
+
+def test_flush_after_a_failure_writes_the_records_again(monkeypatch):
+    monkeypatch.setattr(persistence_worker, "RETRY_MIN_SECONDS", 60)
+    writer = FlakyWriter(failures=1)
+    worker = make_worker(writer)
+    assert worker.submit([{"n": 1}]).result(timeout=5) is False
+    # flush() skips the backoff instead of reporting success with nothing written
+    assert worker.flush().result(timeout=5) is True
+    assert writer.written == [{"n": 1}]
+    worker.stop()
+
+
+def test_stop_retries_a_failed_write(monkeypatch):
+    monkeypatch.setattr(persistence_worker, "RETRY_MIN_SECONDS", 60)
+    writer = FlakyWriter(failures=1)
+    worker = make_worker(writer)
+    assert worker.submit([{"n": 1}]).result(timeout=5) is False
+    worker.stop()
+    assert writer.written == [{"n": 1}]
+
+
+def test_stop_gives_up_when_the_last_attempt_fails(monkeypatch):
+    monkeypatch.setattr(persistence_worker, "RETRY_MIN_SECONDS", 60)
+    writer = FlakyWriter(failures=10)
+    worker = make_worker(writer)
+    worker.submit([{"n": 1}]).result(timeout=5)
+    stopper = threading.Thread(target=worker.stop)
+    stopper.start()
+    stopper.join(timeout=5)
+    assert not stopper.is_alive()
+    assert len(writer.calls) == 2
@@ -0,0 +1,117 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from db import in_memory_db
+from db.sqlite_storage import SqliteEngine
+from db.task_record import TaskRecord
+
+
+def put(column, task):
+    return {"op": "put", "column": column, "task": task.to_dict()}
+
+
+def columns(data):
+    return {column: [(task.id, task.text, task.order) for task in tasks] for column, tasks in data.items()}
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """Two shared engines on one database, as used by two worker processes"""
+    path = str(tmp_path / "tasks_data.db")
+    first, second = SqliteEngine(path, shared=True), SqliteEngine(path, shared=True)
+    first.load()
+    second.load()
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_round_trip(tmp_path):
+    engine = SqliteEngine(str(tmp_path / "tasks_data.db"))
+    assert engine.write_changes([put("signal", TaskRecord("1", "Café ☕", 0)), put("noise", TaskRecord("2", "two", 1024))])
+    assert engine.write_changes([put("signal", TaskRecord("2", "two, moved", 1024)), {"op": "delete", "id": "1"}])
+    engine.close()
+    assert columns(SqliteEngine(str(tmp_path / "tasks_data.db")).load()) == {
+        "signal": [("2", "two, moved", 1024)],
+        "noise": [],
+    }
+
+
+def test_unshared_snapshot_replaces_the_table(tmp_path):
+    engine = SqliteEngine(str(tmp_path / "tasks_data.db"))
+    engine.write_changes([put("signal", TaskRecord("1", "one", 0))])
+    assert engine.save_snapshot([], [TaskRecord("2", "two", 0)])
+    assert columns(engine.load()) == {"signal": [], "noise": [("2", "two", 0)]}
+
+
+def test_pull_changes_sees_the_other_engine_writes(engines):
+    first, second = engines
+    first.write_changes([put("signal", TaskRecord("1", "one", 0)), put("noise", TaskRecord("2", "two", 0))])
+    first.write_changes([{"op": "delete", "id": "2"}])
+    assert second.has_external_changes()
+    changes = second.pull_changes()
+    assert [(task_id, column, task and task.text) for task_id, column, task in changes] == [
+        ("1", "signal", "one"),
+        ("2", None, None),
+    ]
+    assert not second.has_external_changes()
+    # An engine doesn't pull its own writes back
+    assert first.pull_changes() == []
+
+
+def test_shared_snapshot_keeps_rows_the_other_engine_added(engines):
+    first, second = engines
+    first.write_changes([put("signal", TaskRecord("1", "one", 0))])
+    second.pull_changes()
+    # Added by the first engine after the second one last pulled
+    first.write_changes([put("signal", TaskRecord("2", "two", 1024))])
+
+    assert second.save_snapshot([TaskRecord("1", "one, respaced", 2048)], [])
+    # The snapshot is pulled row by row, not as a whole-board reload
+    assert [(task_id, task.order) for task_id, _, task in first.pull_changes()] == [("1", 2048)]
+    assert columns(first.load()) == {"signal": [("2", "two", 1024), ("1", "one, respaced", 2048)], "noise": []}
+
+
+def test_clear_makes_the_other_engine_reload(engines):
+    first, second = engines
+    first.write_changes([put("signal", TaskRecord("1", "one", 0))])
+    assert first.clear()
+    assert second.pull_changes() is None
+    assert columns(second.load()) == {"signal": [], "noise": []}
+
+
+def test_failed_write_is_rolled_back(engines):
+    first, second = engines
+    first.write_changes([put("signal", TaskRecord("1", "one", 0))])
+    second.pull_changes()
+    # The second record is missing its task, so the batch fails as a whole
+    assert not first.write_changes([put("signal", TaskRecord("2", "two", 0)), {"op": "put", "column": "noise"}])
+    assert columns(first.load()) == {"signal": [("1", "one", 0)], "noise": []}
+    assert second.pull_changes() == []
+
+
+def test_failed_snapshot_keeps_the_stored_rows(engines):
+    first, _ = engines
+    first.write_changes([put("signal", TaskRecord("1", "one", 0))])
+    first.close()
+    first.path = "/nonexistent/tasks_data.db"
+    assert not first.save_snapshot([], [])
+    with sqlite3.connect(engines[1].path) as connection:
+        assert connection.execute("SELECT id FROM tasks").fetchall() == [("1",)]
+
+
+def test_store_never_snapshots_shared_storage(engines, monkeypatch):
+    first, second = engines
+    monkeypatch.setattr(in_memory_db, "storage", first)
+    in_memory_db.replace_columns([TaskRecord("1", "one", 0)], [])
+    try:
+        first.write_changes([put("signal", TaskRecord("1", "one", 0))])
+        # Added by another process after this one last synced
+        second.write_changes([put("noise", TaskRecord("2", "two", 0))])
+        assert in_memory_db.mark_dirty().result(timeout=5)
+        assert asyncio.run(in_memory_db.flush())
+    finally:
+        in_memory_db.replace_columns([], [])
+    assert columns(second.load()) == {"signal": [("1", "one", 0)], "noise": [("2", "two", 0)]}